@@ -0,0 +1,114 @@
+import subprocess
+import sys
+import timeit
+
+from neoalchemy import ogm, Session
+from neoalchemy.cypher.compiler import CypherCompiler, Node, Properties, \
+    Variable, Relationship, RelType, Match, Return, Query
+from neoalchemy.types import *
+
+
+class Monkey(ogm.Node):
+    name = ogm.Prop(String)
+    other_name = ogm.Prop('name_number_two', Float)
+
+
+def _timeit(fn, number, repeat=5):
+    """Return the best time of several runs of fn, number times each"""
+    return min(timeit.repeat(fn, number=number, repeat=repeat))
+
+
+def _report(name, number, seconds):
+    print('%-40s %10.0f /s' % (name, number / seconds))
+
+
+def _relationship_chain(length):
+    variable = Variable(Monkey)
+    pieces = [Node('Monkey', variable=variable)]
+    for _ in range(length):
+        pieces.extend((RelType.right(), Node('Monkey')))
+    return Query(match=Match(Relationship(*pieces)),
+                 return_=Return(variable))
+
+
+def _collection_literal(size):
+    variable = Variable(Monkey)
+    props = Properties({'tags': list(range(size)), 'name': 'see'})
+    return Query(match=Match(Node('Monkey', variable, props)),
+                 return_=Return(variable))
+
+
+def bench_compile(number=200):
+    """Compile throughput of deep element trees"""
+    for name, stmt in [
+        ('relationship chain (100 hops)', _relationship_chain(100)),
+        ('collection literal (1000 items)', _collection_literal(1000)),
+    ]:
+        seconds = _timeit(lambda: CypherCompiler(stmt), number)
+        _report('compile ' + name, number, seconds)
+
+
+def bench_inflate(number=100000):
+    """Rows inflated per second by NodeImpl"""
+    props = {'name': 'see', 'name_number_two': 2.0}
+    inflate = Monkey._impl.inflate
+    seconds = _timeit(lambda: inflate(1, dict(props)), number)
+    _report('inflate Monkey rows', number, seconds)
+
+
+def bench_dehydrate(number=100000):
+    """Rows per second prepared by NodeImpl for bulk_create"""
+    props = {'name': 'see', 'name_number_two': 2}
+    dehydrate = Monkey._impl.dehydrate
+    seconds = _timeit(lambda: dehydrate(props), number)
+    _report('dehydrate Monkey rows', number, seconds)
+
+
+def bench_identity_map(number=100000):
+    """Rows loaded per second by a Session, when the node is already in its
+    identity map
+    """
+    session = Session()
+    load = session._loader(Monkey)
+    instance = load(1, {'name': 'see', 'name_number_two': 2.0})
+    props = {'name': 'see', 'name_number_two': 2.0}
+    seconds = _timeit(lambda: load(1, props), number)
+    assert load(1, props) is instance
+    _report('load Monkey rows already in session', number, seconds)
+
+
+_IMPORT_SCRIPT = """
+import sys, time
+start = time.time()
+import neoalchemy.ogm
+elapsed = time.time() - start
+transport = [m for m in ('httplib', 'http.client', 'socket', 'ssl')
+             if m in sys.modules]
+print('%f %s %s' % (elapsed, ','.join(transport) or '-',
+                    neoalchemy.ogm._default_engine is not None))
+"""
+
+
+def bench_import(budget=0.1, runs=5):
+    """Time a cold `import neoalchemy.ogm`, asserting it stays under budget
+    seconds and loads no transport
+    """
+    timings = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', _IMPORT_SCRIPT])
+        elapsed, transport, engine_built = output.decode('ascii').split()
+        assert transport == '-', 'Transport imported: %s' % transport
+        assert engine_built == 'False', 'Default engine built on import'
+        timings.append(float(elapsed))
+
+    best = min(timings)
+    print('%-40s %10.1f ms' % ('import neoalchemy.ogm', best * 1000))
+    assert best < budget, 'Import took %.3fs; budget is %.3fs' % (best, budget)
+
+
+if __name__ == '__main__':
+    bench_compile()
+    bench_inflate()
+    bench_dehydrate()
+    bench_identity_map()
+    bench_import()
@@ -1 +1,3 @@
-from .ogm import Node, Prop, Query
+from .engine import create_engine
+from .ogm import Node, Prop, Query, Rel, RelEntity, eager
+from .session import Session
@@ -0,0 +1,561 @@
+"""asyncio counterparts of Engines and Queries. Requires Python 3.6+.
+
+Queries compile and inflate exactly as their blocking counterparts do; only
+the transport differs. Statements are sent over non-blocking HTTP connections,
+kept alive in a pool shared by the tasks of an event loop::
+
+    engine = create_async_engine('http://localhost:7474/db/data/')
+
+    monkeys = await AsyncQuery(Monkey).with_engine(engine).all()
+
+    async for monkey in AsyncQuery(Monkey).with_engine(engine):
+        ...
+"""
+
+import asyncio
+import collections
+import logging
+import socket
+import ssl
+import time
+
+from . import exc, ogm
+from .engine import Engine, ResultParser
+
+
+def create_async_engine(url, **kwargs):
+    """Create an AsyncEngine for the Neo4j server at url. Keyword arguments
+    are passed along to :class:`AsyncEngine`.
+    """
+    return AsyncEngine(url, **kwargs)
+
+
+class _AsyncResponse(object):
+    """The status, headers and body of an HTTP/1.1 response, read from an
+    asyncio stream
+    """
+
+    def __init__(self, reader):
+        self._reader = reader
+        self._chunked = False
+        self._chunk_left = 0
+        self._length = None
+        self._done = False
+        self.status = None
+        self.reason = None
+        self.headers = {}
+        self.will_close = False
+
+    async def read_head(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionResetError('Connection closed by server')
+        version, status, reason = (line.decode('latin-1').rstrip('\r\n')
+                                   .split(' ', 2) + [''])[:3]
+        self.status = int(status)
+        self.reason = reason
+
+        while True:
+            line = await self._reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            self.headers[name.strip().lower()] = value.strip()
+
+        self._chunked = 'chunked' in self.headers.get(
+            'transfer-encoding', '').lower()
+        if 'content-length' in self.headers:
+            self._length = int(self.headers['content-length'])
+        self.will_close = (
+            self.headers.get('connection', '').lower() == 'close' or
+            (not self._chunked and self._length is None))
+
+    async def read(self, amt):
+        """Return up to amt bytes of the body, or b'' once it's been read"""
+        if self._done:
+            return b''
+
+        if self._chunked:
+            if not self._chunk_left:
+                line = await self._reader.readline()
+                size = int(line.split(b';', 1)[0], 16)
+                if not size:
+                    # Skip any trailers
+                    while (await self._reader.readline()) not in (
+                            b'\r\n', b'\n', b''):
+                        pass
+                    self._done = True
+                    return b''
+                self._chunk_left = size
+            data = await self._reader.read(min(amt, self._chunk_left))
+            if not data:
+                raise ConnectionResetError('Connection closed mid-response')
+            self._chunk_left -= len(data)
+            if not self._chunk_left:
+                await self._reader.readexactly(2)
+            return data
+
+        if self._length is not None:
+            if not self._length:
+                self._done = True
+                return b''
+            data = await self._reader.read(min(amt, self._length))
+            if not data:
+                raise ConnectionResetError('Connection closed mid-response')
+            self._length -= len(data)
+            return data
+
+        data = await self._reader.read(amt)
+        if not data:
+            self._done = True
+        return data
+
+    async def read_all(self):
+        chunks = []
+        while True:
+            chunk = await self.read(65536)
+            if not chunk:
+                return b''.join(chunks)
+            chunks.append(chunk)
+
+
+class _AsyncConnection(object):
+    """A keep-alive HTTP connection, opened on first use"""
+
+    def __init__(self, engine):
+        self._engine = engine
+        self._reader = None
+        self._writer = None
+        self.starttime = time.time()
+
+    @property
+    def is_open(self):
+        return self._writer is not None
+
+    def is_dropped(self):
+        """Whether the server has closed the connection while it sat idle"""
+        return (self._writer.transport.is_closing() or
+                self._reader.at_eof() or
+                self._reader.exception() is not None)
+
+    async def send(self, path, headers, body):
+        if self._writer is None:
+            self._reader, self._writer = await self._engine._open()
+
+        lines = ['POST %s HTTP/1.1' % path,
+                 'Host: %s' % self._engine._host_header,
+                 'Content-Length: %d' % len(body)]
+        lines.extend('%s: %s' % item for item in headers.items())
+        head = '\r\n'.join(lines) + '\r\n\r\n'
+        self._writer.write(head.encode('latin-1') + body)
+        await self._writer.drain()
+
+    async def getresponse(self):
+        response = _AsyncResponse(self._reader)
+        await response.read_head()
+        return response
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+
+class AsyncPool(object):
+    """A pool of connections for the tasks of an event loop.
+
+    At most pool_size connections are open at once; further checkouts wait
+    for one to be checked in, up to timeout seconds. Checkout wait times are
+    tracked as in :class:`neoalchemy.pool.QueuePool`.
+    """
+
+    logger = logging.getLogger(__name__ + '.AsyncPool')
+
+    def __init__(self, creator, pool_size=10, timeout=30, recycle=-1):
+        self._creator = creator
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._recycle = recycle
+        self._idle = collections.deque()
+        self._semaphore = None
+
+        #: Number of checkouts made from the pool
+        self.checkouts = 0
+        #: Total seconds spent waiting for connections on checkout
+        self.checkout_wait_total = 0.0
+        #: Longest time, in seconds, spent waiting on a single checkout
+        self.checkout_wait_max = 0.0
+
+    @property
+    def checkout_wait_mean(self):
+        """Mean seconds spent waiting for a connection on checkout"""
+        if not self.checkouts:
+            return 0.0
+        return self.checkout_wait_total / self.checkouts
+
+    async def checkout(self):
+        if self._semaphore is None:
+            # Created here, so it's bound to the loop using the pool
+            self._semaphore = asyncio.Semaphore(self._pool_size)
+
+        start = time.time()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self._timeout)
+        except asyncio.TimeoutError:
+            raise exc.TimeoutError(
+                'AsyncPool limit of size %d reached, connection timed out, '
+                'timeout %d' % (self._pool_size, self._timeout))
+        waited = time.time() - start
+
+        self.checkouts += 1
+        self.checkout_wait_total += waited
+        if waited > self.checkout_wait_max:
+            self.checkout_wait_max = waited
+
+        while self._idle:
+            connection = self._idle.pop()
+            if (self._recycle > -1 and
+                    time.time() - connection.starttime > self._recycle):
+                connection.close()
+                continue
+            return connection
+        return self._creator()
+
+    def checkin(self, connection):
+        self._idle.append(connection)
+        self._semaphore.release()
+
+    def discard(self, connection):
+        """Close a checked out connection which is unfit to be reused"""
+        connection.close()
+        self._semaphore.release()
+
+    def dispose(self):
+        """Close all connections idle in the pool"""
+        while self._idle:
+            self._idle.pop().close()
+
+    def status(self):
+        return ('Pool size: %d  Idle connections: %d Mean checkout wait: '
+                '%.4fs Max checkout wait: %.4fs' % (
+                    self._pool_size, len(self._idle),
+                    self.checkout_wait_mean, self.checkout_wait_max))
+
+
+class AsyncEngine(Engine):
+    """Runs Cypher statements against a Neo4j server without blocking the
+    event loop.
+
+    Takes the same url as :class:`neoalchemy.engine.Engine`.
+
+    :param pool_size: The most connections open at once.
+    :param pool_timeout: Seconds to wait for a connection from an exhausted
+      pool before raising TimeoutError.
+    :param pool_recycle: Seconds after which a connection is replaced. -1
+      disables recycling.
+    :param timeout: Seconds to wait for a connection to be established.
+    """
+
+    is_async = True
+
+    def __init__(self, url, pool_size=10, pool_timeout=30, pool_recycle=-1,
+                 timeout=None):
+        super(AsyncEngine, self).__init__(url, timeout=timeout)
+        default_port = 443 if self._scheme == 'https' else 80
+        self._port = self._port or default_port
+        self._host_header = '%s:%d' % (self._host, self._port)
+        self.pool = AsyncPool(lambda: _AsyncConnection(self),
+                              pool_size=pool_size,
+                              timeout=pool_timeout,
+                              recycle=pool_recycle)
+
+    def __repr__(self):
+        return 'AsyncEngine(%s)' % self.url
+
+    async def _open(self):
+        ssl_context = None
+        if self._scheme == 'https':
+            ssl_context = ssl.create_default_context()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self._host, self._port, ssl=ssl_context),
+            self._timeout)
+        # Requests are written whole; don't hold them back waiting on ACKs
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return reader, writer
+
+    async def execute(self, statement, params=None):
+        """Run statement with params, returning an AsyncResultProxy which
+        streams its rows
+        """
+        body = self._request_body(statement, params).encode('utf-8')
+
+        connection = await self.pool.checkout()
+        try:
+            response = await self._send(connection, body)
+        except BaseException:
+            self.pool.discard(connection)
+            raise
+
+        result = AsyncResultProxy(self.pool, connection, response)
+        await result._start()
+        return result
+
+    async def _send(self, connection, body):
+        """POST body to the commit endpoint.
+
+        As with :meth:`Engine._send`, a pooled connection the server has
+        closed while idle is replaced, and the request only retried if it
+        couldn't be sent over a reused connection.
+        """
+        reused = connection.is_open
+        if reused and connection.is_dropped():
+            self.logger.debug('Connection dropped while idle; reconnecting')
+            connection.close()
+            reused = False
+
+        try:
+            await connection.send(self._commit_url, self._headers, body)
+        except ConnectionError:
+            if not reused:
+                raise
+            self.logger.debug('Connection dropped; reconnecting',
+                              exc_info=True)
+            connection.close()
+            await connection.send(self._commit_url, self._headers, body)
+        return await connection.getresponse()
+
+    def dispose(self):
+        self.pool.dispose()
+
+
+class AsyncResultProxy(object):
+    """Streams the rows of a statement's result without blocking the event
+    loop. Iterate over it with ``async for``.
+    """
+
+    #: Bytes read from the response at a time
+    chunk_size = 8192
+
+    def __init__(self, pool, connection, response):
+        self._pool = pool
+        self._connection = connection
+        self._response = response
+        self._parser = ResultParser()
+        self._rows = collections.deque()
+        self._eof = False
+        self.closed = False
+
+    async def _start(self):
+        try:
+            if self._response.status != 200:
+                body = await self._response.read_all()
+                raise exc.DatabaseError(
+                    'Server responded %d %s: %s' % (
+                        self._response.status, self._response.reason, body))
+            # Read up to the first row, so a failed statement raises now
+            while not self._parser.in_rows and await self._fill():
+                pass
+        except BaseException:
+            self._close(reusable=False)
+            raise
+
+    @property
+    def columns(self):
+        """Names of the result's columns"""
+        return self._parser.columns
+
+    @property
+    def stats(self):
+        """Counters of the statement's effects, once all rows are consumed"""
+        return self._parser.stats
+
+    @property
+    def result(self):
+        """The complete result, once all rows are consumed"""
+        return self._parser.result
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        rows = self._rows
+        try:
+            while rows or await self._fill():
+                while rows:
+                    yield rows.popleft()
+        except BaseException:
+            self._close(reusable=False)
+            raise
+
+    async def fetchall(self):
+        return [row async for row in self]
+
+    def close(self):
+        """Release the connection. If rows remain unread, the connection can
+        not be reused, and is closed.
+        """
+        self._close(reusable=self._eof)
+
+    def _close(self, reusable):
+        if self.closed:
+            return
+        self.closed = True
+        if reusable and not self._response.will_close:
+            self._pool.checkin(self._connection)
+        else:
+            self._pool.discard(self._connection)
+
+    async def _fill(self):
+        if self._eof:
+            return False
+
+        chunk = await self._response.read(self.chunk_size)
+        if chunk:
+            self._parser.feed(chunk)
+            self._rows.extend(self._parser.rows())
+            return True
+
+        self._eof = True
+        self._parser.close()
+        self._close(reusable=True)
+        return False
+
+
+_default_engine = None
+
+
+def get_default_engine():
+    """Return the AsyncEngine used by async queries not bound to another one.
+    Unless set_default_engine() was called, it's created on first use, from
+    ogm.DEFAULT_URL.
+    """
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = create_async_engine(ogm.DEFAULT_URL)
+    return _default_engine
+
+
+def set_default_engine(engine):
+    """Use engine for async queries not bound to another one"""
+    global _default_engine
+    _default_engine = engine
+
+
+class AsyncQuery(ogm.Query):
+    """A Query run with ``await query.all()`` or ``async for``, through an
+    AsyncEngine.
+
+    Methods running the query are coroutines, or return async iterators, in
+    place of their blocking counterparts: ``await`` count(), exists(),
+    update(), delete(), explain() and profile(), and iterate over values()
+    and iter_pages() with ``async for``. Rels of the instances returned
+    can't be loaded lazily, which would block; load them with eager().
+    """
+
+    def get_engine(self):
+        """Return the AsyncEngine this query will run with: the one given to
+        with_engine(), else the default async engine
+        """
+        if self._engine is not None:
+            return self._engine
+        return get_default_engine()
+
+    def __iter__(self):
+        raise TypeError('AsyncQuery must be iterated with "async for"')
+
+    def __aiter__(self):
+        return self._execute()
+
+    async def all(self):
+        return [instance async for instance in self]
+
+    async def iter_pages(self, key=None, page_size=100):
+        """Generate lists of up to page_size results, paginated by key; see
+        :meth:`neoalchemy.ogm.Query.iter_pages`
+        """
+        query = self._paged(key, page_size)
+        page_query = query
+        while True:
+            page = await page_query.all()
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            page_query = query._after(key, page[-1])
+
+    async def update(self, values, batch_size=None):
+        """Set properties on every node matched by the query; see
+        :meth:`neoalchemy.ogm.Query.update`
+        """
+        self._check_batch_size(batch_size)
+        if batch_size is None:
+            return (await self._rows(self._update_statement(values)))[0][0]
+
+        node_ids = [row[0] for row in await self._rows(self._ids_statement())]
+        updated = 0
+        for start in range(0, len(node_ids), batch_size):
+            stmt = self._update_statement(
+                values, node_ids[start:start + batch_size])
+            updated += (await self._rows(stmt))[0][0]
+        return updated
+
+    async def delete(self, detach=True, batch_size=None):
+        """Delete every node matched by the query; see
+        :meth:`neoalchemy.ogm.Query.delete`
+        """
+        self._check_batch_size(batch_size)
+        stmt = self._delete_statement(detach, batch_size)
+
+        deleted = 0
+        while True:
+            result = await self._run(stmt)
+            await result.fetchall()
+            count = (result.stats or {}).get('nodes_deleted', 0)
+            deleted += count
+            if batch_size is None or count < batch_size:
+                return deleted
+
+    async def _run(self, stmt):
+        comp, params = self.compiled_cache.compile(stmt, parameterized=True)
+        return await self.get_engine().execute(comp.compile(), params)
+
+    async def _rows(self, stmt):
+        result = await self._run(stmt)
+        return await result.fetchall()
+
+    async def _scalar(self, stmt):
+        rows = await self._rows(stmt)
+        return rows[0][0] if rows else None
+
+    async def _plan(self, stmt):
+        result = await self._run(stmt)
+        await result.fetchall()
+        return ogm.Plan.from_result(result.result)
+
+    async def _execute(self):
+        """Generate inflated results, streaming rows from the server"""
+        comp, params = self._compile()
+        query_string = comp.compile()
+        self.logger.debug('%s %r', query_string, params)
+
+        process = self._row_processor()
+        yield_per = self._batch_size()
+        result = await self.get_engine().execute(query_string, params)
+        try:
+            if yield_per is None:
+                async for row in result:
+                    yield process(row)
+            else:
+                batch = []
+                async for row in result:
+                    batch.append(row)
+                    if len(batch) == yield_per:
+                        for instance in [process(r) for r in batch]:
+                            yield instance
+                        batch = []
+                for instance in [process(r) for r in batch]:
+                    yield instance
+        finally:
+            result.close()
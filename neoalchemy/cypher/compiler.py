@@ -1,4 +1,3 @@
-import operator
 import re
 
 from .. import util
@@ -13,7 +12,11 @@ def _literal_as_text(element):
         return element
     elif isinstance(element, util.string_types):
         return StringLiteral(element)
-    elif isinstance(element, (int, long, float)):
+    elif element is None:
+        return Raw('null')
+    elif isinstance(element, bool):
+        return Raw('true' if element else 'false')
+    elif isinstance(element, util.int_types + (float,)):
         return Raw(str(element))
     elif hasattr(element, '__iter__'):
         return Collection(element)
@@ -22,31 +25,62 @@ def _literal_as_text(element):
             'Unsupported literal type %s' % type(element))
 
 
-class VisitableMeta(type):
-    def __init__(cls, clsname, bases, clsdict):
-        if clsname != 'Visitable' and hasattr(cls, '__visit_name__'):
-            getter = operator.attrgetter('visit_%s' % cls.__visit_name__)
-
-            def _compiler_dispatch(self, visitor, **kwargs):
-                try:
-                    meth = getter(visitor)
-                except AttributeError:
-                    raise UnsupportedCompilationError(visitor, cls)
-                else:
-                    return meth(self, **kwargs)
-            cls._compiler_dispatch = _compiler_dispatch
+def _cache_key_for(value, bindparams=None):
+    """Return a hashable cache key for an element attribute value"""
+    if isinstance(value, Element):
+        return value._gen_cache_key(bindparams)
+    elif isinstance(value, dict):
+        return tuple((k, _cache_key_for(v, bindparams))
+                     for k, v in sorted(value.items()))
+    elif isinstance(value, (list, tuple)):
+        return tuple(_cache_key_for(v, bindparams) for v in value)
+    else:
+        # 1, 1.0 and True hash alike, but compile to different literals
+        return value.__class__, value
 
-        type.__init__(cls, clsname, bases, clsdict)
+
+class BindCollector(object):
+    """Collects the BindParameters of a statement as its cache key is
+    generated, each once, in the order the cache key reaches them
+    """
+
+    def __init__(self):
+        self.bindparams = []
+        self._seen = set()
+
+    def add(self, bindparam):
+        if id(bindparam) not in self._seen:
+            self._seen.add(id(bindparam))
+            self.bindparams.append(bindparam)
+
+    def __len__(self):
+        return len(self.bindparams)
+
+    def __iter__(self):
+        return iter(self.bindparams)
+
+    def __getitem__(self, index):
+        return self.bindparams[index]
 
 
 class Visitable(object):
-    __metaclass__ = VisitableMeta
     __visit_name__ = 'visitable'
 
+    def _compiler_dispatch(self, visitor, **kwargs):
+        try:
+            meth = visitor._dispatch_table[self.__class__]
+        except KeyError:
+            meth = visitor._resolve_dispatch(self.__class__)
+        return meth(visitor, self, **kwargs)
+
 
 class Element(Visitable):
     __visit_name__ = 'element'
 
+    #: Names of the attributes which determine the compiled form of the
+    #: element. These are used to build the element's cache key.
+    _cache_key_attrs = ()
+
     def __str__(self):
         return self._compile()
 
@@ -57,9 +91,24 @@ class Element(Visitable):
     def _compile(self, **kw):
         return self._compiler_dispatch(self.default_compiler, **kw)
 
+    def _gen_cache_key(self, bindparams=None):
+        """Return a hashable structure representing the shape of this element.
+
+        Two element trees with equal cache keys compile to the same Cypher, so
+        the key can be used to look up a previously compiled statement.
+
+        :param bindparams: If a BindCollector is passed, the values of bind
+          parameters are left out of the key, and the BindParameters are
+          added to it in the order the key reaches them.
+        """
+        return (self.__class__,) + tuple(
+            _cache_key_for(getattr(self, attr), bindparams)
+            for attr in self._cache_key_attrs)
+
 
 class MatchPiece(Element):
     __visit_name__ = 'match_piece'
+    _cache_key_attrs = ('label', 'variable', 'properties')
 
     def __init__(self, label=None, variable=None, properties=None):
         # Label is static. It's a string or None.
@@ -78,14 +127,62 @@ class RelPiece(MatchPiece):
 
 class Match(Element):
     __visit_name__ = 'match'
+    _cache_key_attrs = ('pieces',)
 
     def __init__(self, *pieces):
         #: List of MatchPieces
         self.pieces = pieces
 
 
+class OptionalMatch(Match):
+    """A MATCH whose pattern binds null to its new variables, rather than
+    dropping the row, where it isn't found
+    """
+    __visit_name__ = 'optional_match'
+
+
+class UsingIndex(Element):
+    __visit_name__ = 'using_index'
+    _cache_key_attrs = ('variable', 'label', 'name', 'seek')
+
+    def __init__(self, variable, label, name, seek=False):
+        """A hint that the planner should find the nodes of variable through
+        the index of label's property name. If seek is True, the index must
+        be sought, rather than scanned.
+        """
+        self.variable = variable
+        self.label = label
+        self.name = name
+        self.seek = seek
+
+
+class UsingScan(Element):
+    __visit_name__ = 'using_scan'
+    _cache_key_attrs = ('variable', 'label')
+
+    def __init__(self, variable, label):
+        """A hint that the planner should find the nodes of variable by
+        scanning label
+        """
+        self.variable = variable
+        self.label = label
+
+
+class CypherOptions(Element):
+    __visit_name__ = 'cypher_options'
+    _cache_key_attrs = ('options',)
+
+    def __init__(self, options):
+        """Options selecting how the server plans and runs the statement,
+        e.g. CypherOptions({'runtime': 'slotted'}), prefixed to it
+        """
+        #: Pairs of option names and values, sorted by name
+        self.options = tuple(sorted(options.items()))
+
+
 class Return(Element):
     __visit_name__ = 'return'
+    _cache_key_attrs = ('expressions',)
 
     def __init__(self, *expressions):
         #: List of Expressions to return
@@ -94,6 +191,7 @@ class Return(Element):
 
 class Query(Element):
     __visit_name__ = 'query'
+    _cache_key_attrs = ('match', 'return_')
 
     def __init__(self, match=None, return_=None):
         self.match = match
@@ -103,8 +201,138 @@ class Query(Element):
             raise UnsupportedCompilationError(self)
 
 
+class Statement(Element):
+    __visit_name__ = 'statement'
+    _cache_key_attrs = ('clauses',)
+
+    def __init__(self, *clauses):
+        """A statement made of clauses, compiled in the order given, e.g.
+        Statement(Unwind(...), Create(...), Return(...))
+        """
+        self.clauses = clauses
+
+
+class Where(Element):
+    __visit_name__ = 'where'
+    _cache_key_attrs = ('criteria',)
+
+    def __init__(self, *criteria):
+        #: Expressions which must all hold
+        self.criteria = criteria
+
+
+class Unwind(Element):
+    __visit_name__ = 'unwind'
+    _cache_key_attrs = ('expression', 'variable')
+
+    def __init__(self, expression, variable):
+        #: The list to unwind, usually a BindParameter
+        self.expression = expression
+        #: The Variable each element of the list is bound to
+        self.variable = variable
+
+
+class Create(Element):
+    __visit_name__ = 'create'
+    _cache_key_attrs = ('pieces',)
+
+    def __init__(self, *pieces):
+        #: List of Nodes or Relationships to create
+        self.pieces = pieces
+
+
+class With(Element):
+    __visit_name__ = 'with'
+    _cache_key_attrs = ('expressions', 'distinct')
+
+    def __init__(self, *expressions, **kwargs):
+        """Pass expressions on to the following clauses.
+
+        :param distinct: If True, duplicate rows are passed on once
+          (``WITH DISTINCT``).
+        """
+        #: List of Expressions passed on to the following clauses
+        self.expressions = expressions
+        self.distinct = kwargs.pop('distinct', False)
+        if kwargs:
+            raise ArgumentError('Unhandled arguments', kwargs)
+
+
+class OrderBy(Element):
+    __visit_name__ = 'order_by'
+    _cache_key_attrs = ('expressions',)
+
+    def __init__(self, *expressions):
+        #: List of Expressions to sort by
+        self.expressions = expressions
+
+
+class Skip(Element):
+    __visit_name__ = 'skip'
+    _cache_key_attrs = ('count',)
+
+    def __init__(self, count):
+        #: The number of rows to skip, usually a BindParameter
+        self.count = _literal_as_text(count)
+
+
+class Limit(Element):
+    __visit_name__ = 'limit'
+    _cache_key_attrs = ('count',)
+
+    def __init__(self, count):
+        #: The most rows to return, usually a BindParameter
+        self.count = _literal_as_text(count)
+
+
+class Delete(Element):
+    __visit_name__ = 'delete'
+    _cache_key_attrs = ('expressions', 'detach')
+
+    def __init__(self, *expressions, **kwargs):
+        """Delete the nodes or relationships of expressions.
+
+        :param detach: If True, a node's relationships are deleted along with
+          it (``DETACH DELETE``). Otherwise, deleting a node which still has
+          relationships fails.
+        """
+        self.expressions = expressions
+        self.detach = kwargs.pop('detach', False)
+        if kwargs:
+            raise ArgumentError('Unhandled arguments', kwargs)
+
+
+class Merge(Element):
+    __visit_name__ = 'merge'
+    _cache_key_attrs = ('pattern', 'on_create', 'on_match')
+
+    def __init__(self, pattern, on_create=None, on_match=None):
+        #: The Node or Relationship to match, or create if it doesn't exist
+        self.pattern = pattern
+        #: An optional SetProperties applied if the pattern was created
+        self.on_create = on_create
+        #: An optional SetProperties applied if the pattern was matched
+        self.on_match = on_match
+
+
+class SetProperties(Element):
+    __visit_name__ = 'set_properties'
+    _cache_key_attrs = ('variable', 'expression', 'update')
+
+    def __init__(self, variable, expression, update=False):
+        """Set the properties of variable from the map expression.
+
+        :param update: If True, the map is merged into the existing properties
+          (``SET n += map``), rather than replacing them (``SET n = map``).
+        """
+        self.variable = variable
+        self.expression = expression
+        self.update = update
+
+
 class Relationship(Element):
     __visit_name__ = 'relationship'
+    _cache_key_attrs = ('pieces',)
 
     def __init__(self, start_node, *args):
         """Represents a relationship between nodes
@@ -154,9 +382,10 @@ class Relationship(Element):
 
 class RelType(Element):
     __visit_name__ = 'rel_type'
+    _cache_key_attrs = ('left', 'right')
 
     def __init__(self, left=False, right=False):
-        if left and left:
+        if left and right:
             raise UnsupportedCompilationError(
                 'Cannot have both a left and right reltype', self)
 
@@ -183,12 +412,62 @@ class RelType(Element):
         return self.left or self.right
 
 
+class Explain(Element):
+    __visit_name__ = 'explain'
+    _cache_key_attrs = ('statement', 'profile')
+
+    def __init__(self, statement, profile=False):
+        """statement, prefixed to return its plan rather than its results
+        (EXPLAIN), or along with them (PROFILE)
+        """
+        self.statement = statement
+        self.profile = profile
+
+
+class Call(Element):
+    __visit_name__ = 'call'
+    _cache_key_attrs = ('procedure',)
+
+    def __init__(self, procedure):
+        """A call of a procedure, given as a FunctionCall, e.g.
+        Call(FunctionCall('db.indexes'))
+        """
+        self.procedure = procedure
+
+
+class CreateIndex(Element):
+    __visit_name__ = 'create_index'
+    _cache_key_attrs = ('label', 'name')
+
+    def __init__(self, label, name):
+        """An index of the property name of nodes labeled label"""
+        self.label = label
+        self.name = name
+
+
+class DropIndex(CreateIndex):
+    __visit_name__ = 'drop_index'
+
+
+class CreateUniqueConstraint(Element):
+    __visit_name__ = 'create_unique_constraint'
+    _cache_key_attrs = ('label', 'name')
+
+    def __init__(self, label, name):
+        """A constraint that no two nodes labeled label share a value of the
+        property name. The server indexes the property to enforce it.
+        """
+        self.label = label
+        self.name = name
+
+
 class Expression(Element):
     """An Expression which can be used as a value or returned"""
 
 
 class Variable(Expression):
     __visit_name__ = 'variable'
+    _cache_key_attrs = ('node_type', 'name')
 
     def __init__(self, node_type, name=None):
         """
@@ -203,34 +482,77 @@ class Variable(Expression):
 
 class BindParameter(Expression):
     __visit_name__ = 'bindparam'
+    _cache_key_attrs = ('key', 'value', 'type_', 'unique')
 
     def __init__(self, key, value=NO_ARG, type_=None, unique=False):
         """A BindParameter is used as a placeholder in a query. It can carry a
         value to be passed as a parameter, or one can be provided at execution
         time.
 
+        :param key: The name of the parameter. If unique is True, the compiler
+          will derive a name from it which doesn't clash with other params.
+        :param type_: An optional PropType, whose bind_processor is used to
+          convert the value before it's sent.
         """
         if value is NO_ARG:
             value = None
 
-        # TODO: something about counters and anon maps and yada yada
         self.key = key
         self.value = value
+        self.type_ = type_
         self.unique = unique
 
+    def _gen_cache_key(self, bindparams=None):
+        if bindparams is None:
+            return super(BindParameter, self)._gen_cache_key()
+
+        bindparams.add(self)
+        return self.__class__, self.key, self.type_, self.unique
+
 
 class Properties(Element):
     __visit_name__ = 'properties'
+    _cache_key_attrs = ('props', 'variable')
 
-    def __init__(self, props=None, variable=None):
+    def __init__(self, props=None, variable=None, types=None):
         #: A map of string keys to either literals or Node properties
         self.props = props
         #: A bound variable representing the entire properties map in the query
         self.variable = variable
+        #: Maps keys of props to the PropTypes whose bind_processors their
+        #: literal values are sent through
+        self.types = types or {}
+
+        self._bound_props = None
+
+    def bound_props(self):
+        """Return props with each literal value wrapped in a BindParameter.
+
+        The same BindParameters are returned on every call, so a statement's
+        cache key and its parameterized compile refer to the same parameters.
+        """
+        if self._bound_props is None:
+            bound = {}
+            for key, value in list((self.props or {}).items()):
+                if not isinstance(value, Element):
+                    value = BindParameter(key, value, type_=self.types.get(key),
+                                          unique=True)
+                bound[key] = value
+            self._bound_props = bound
+        return self._bound_props
+
+    def _gen_cache_key(self, bindparams=None):
+        if bindparams is None:
+            return super(Properties, self)._gen_cache_key()
+
+        return (self.__class__,
+                _cache_key_for(self.bound_props(), bindparams),
+                _cache_key_for(self.variable, bindparams))
 
 
 class StringLiteral(Expression):
     __visit_name__ = 'string'
+    _cache_key_attrs = ('s',)
 
     def __init__(self, s):
         self.s = s
@@ -238,6 +560,7 @@ class StringLiteral(Expression):
 
 class Raw(Expression):
     __visit_name__ = 'raw'
+    _cache_key_attrs = ('v',)
 
     def __init__(self, v):
         self.v = v
@@ -245,14 +568,106 @@ class Raw(Expression):
 
 class Collection(Expression):
     __visit_name__ = 'collection'
+    _cache_key_attrs = ('elements',)
 
     def __init__(self, elements):
         self.elements = [_literal_as_text(e) for e in elements]
 
 
-class Compiler(object):
+class FunctionCall(Expression):
+    __visit_name__ = 'function_call'
+    _cache_key_attrs = ('name', 'args', 'distinct')
+
+    def __init__(self, name, *args, **kwargs):
+        """A call of the Cypher function name, e.g. FunctionCall('id', var).
+
+        :param distinct: If True, an aggregating function only aggregates
+          distinct values, e.g. ``count(DISTINCT n)``.
+        """
+        self.name = name
+        self.args = [_literal_as_text(a) for a in args]
+        self.distinct = kwargs.pop('distinct', False)
+        if kwargs:
+            raise ArgumentError('Unhandled arguments', kwargs)
+
+
+class Ordering(Expression):
+    __visit_name__ = 'ordering'
+    _cache_key_attrs = ('expression', 'descending')
+
+    def __init__(self, expression, descending=False):
+        """An expression to sort by, in the order given"""
+        self.expression = expression
+        self.descending = descending
+
+
+class PropertyAccess(Expression):
+    __visit_name__ = 'property_access'
+    _cache_key_attrs = ('expression', 'key')
+
+    def __init__(self, expression, key):
+        """A property of a node or map, e.g. PropertyAccess(row, 'id')"""
+        self.expression = expression
+        self.key = key
+
+
+class Alias(Expression):
+    __visit_name__ = 'alias'
+    _cache_key_attrs = ('expression', 'name')
+
+    def __init__(self, expression, name):
+        """An expression projected under name, e.g. in a WITH. Following
+        clauses refer to it as Variable(None, name).
+        """
+        self.expression = expression
+        self.name = name
+
+
+class BinaryExpression(Expression):
+    __visit_name__ = 'binary'
+    _cache_key_attrs = ('left', 'operator', 'right')
+
+    def __init__(self, left, operator, right):
+        """Two expressions joined by a Cypher operator, e.g. '='"""
+        self.left = _literal_as_text(left)
+        self.operator = operator
+        self.right = _literal_as_text(right)
+
+    def __bool__(self):
+        # Comparing props builds a BinaryExpression rather than a bool, so
+        # e.g. ``if Monkey.name == 'Bubbles':`` would always be true
+        raise TypeError('Boolean value of this clause is not defined')
+
+    __nonzero__ = __bool__
+
+
+class CompilerMeta(type):
+    def __init__(cls, clsname, bases, clsdict):
+        #: Maps Visitable classes to the visit method which compiles them.
+        #: Each compiler class gets its own table, filled in the first time
+        #: an element class is dispatched.
+        cls._dispatch_table = {}
+
+        type.__init__(cls, clsname, bases, clsdict)
+
+
+class Compiler(util.with_metaclass(CompilerMeta, object)):
     """Base compiler class"""
 
+    @classmethod
+    def _resolve_dispatch(cls, element_cls):
+        """Look up the visit method for element_cls and store it in the
+        dispatch table
+        """
+        meth = getattr(cls, 'visit_%s' % element_cls.__visit_name__, None)
+        if meth is None:
+            raise UnsupportedCompilationError(cls, element_cls)
+
+        # Store the plain function, sparing the unbound method checks
+        meth = getattr(meth, '__func__', meth)
+        cls._dispatch_table[element_cls] = meth
+        return meth
+
     def __init__(self, stmt):
         self.stmt = stmt
         self.string = None
@@ -276,16 +691,120 @@ class Compiler(object):
 
 
 class CypherCompiler(Compiler):
-    def __init__(self, stmt):
+    #: Template used to render a bind parameter placeholder
+    bindtemplate = '$%(name)s'
+
+    def __init__(self, stmt, parameterized=False):
+        """
+        :param parameterized: If True, literal values are rendered as bind
+          parameter placeholders, and their values are collected in
+          :attr:`binds`. Otherwise, values are inlined into the query.
+        """
+        self.parameterized = parameterized
         #: Maps anonymous Variables (those without a name) to their given name
         self.anon_vars = {}
         #: A counter used to build anonymous Variable names
         self.anon_counter = 1
         #: Maps variable names to their sources
         self.var_names = {}
+        #: Maps bind names to their BindParameters
+        self.binds = {}
+        #: Bind names of each BindParameter, in the order they were visited
+        self.bind_names = []
+        #: Maps id()s of visited BindParameters to their bind names
+        self._bind_names_by_id = {}
+        #: Counters used to build unique bind names, keyed by bind key
+        self._bind_counters = {}
+        self._bind_processors = None
+        self._bind_positions = None
 
         super(CypherCompiler, self).__init__(stmt)
 
+    @property
+    def params(self):
+        """A dict of bind names to processed values from the statement"""
+        return self.construct_params()
+
+    def construct_params(self, bindparams=None):
+        """Return a dict of bind names to processed values.
+
+        :param bindparams: A list of BindParameters gathered by
+          _gen_cache_key from a statement of the same shape as the one this
+          compiler compiled. Their values are used in place of the compiled
+          statement's own.
+        """
+        if bindparams is None:
+            bound = [(name, self.binds[name]) for name in self.bind_names]
+        else:
+            positions, count = self._get_bind_positions()
+            if len(bindparams) != count:
+                raise ArgumentError(
+                    'Expected %d bind parameters from a statement of the '
+                    'compiled shape, got %d' % (count, len(bindparams)))
+            bound = [(name, bindparams[position])
+                     for name, position in positions]
+        if self._bind_processors is None:
+            self._bind_processors = self._get_bind_processors()
+        return _process_params(bound, self._bind_processors)
+
+    def _get_bind_positions(self):
+        """Return pairs of bind names and the positions of their
+        BindParameters in the compiled statement's cache key, along with the
+        number of BindParameters the cache key reaches.
+
+        Statements of the same shape have their BindParameters reached in the
+        same order by their cache keys, so a statement's values are matched
+        to bind names by those positions, whatever order compilation visited
+        the BindParameters in.
+        """
+        if self._bind_positions is None:
+            collector = BindCollector()
+            self.stmt._gen_cache_key(collector)
+            positions = {}
+            for position, bindparam in enumerate(collector):
+                name = self._bind_names_by_id.get(id(bindparam))
+                if name is not None:
+                    positions.setdefault(name, position)
+            missing = set(self.bind_names) - set(positions)
+            if missing:
+                raise UnsupportedCompilationError(
+                    'Bind parameters %s are not part of the cache key of %r'
+                    % (', '.join(sorted(missing)), self.stmt))
+            self._bind_positions = sorted(positions.items()), len(collector)
+        return self._bind_positions
+
+    def _get_bind_processors(self):
+        processors = {}
+        for name, bindparam in list(self.binds.items()):
+            if bindparam.type_ is not None:
+                processor = bindparam.type_.bind_processor()
+                if processor is not None:
+                    processors[name] = processor
+        return processors
+
+    def _bind_name(self, bindparam):
+        """Return the bind name of bindparam, registering it if necessary"""
+        name = self._bind_names_by_id.get(id(bindparam))
+        if name is not None:
+            return name
+
+        name = bindparam.key
+        if bindparam.unique:
+            while name in self.binds:
+                counter = self._bind_counters.get(bindparam.key, 0) + 1
+                self._bind_counters[bindparam.key] = counter
+                name = '%s_%d' % (bindparam.key, counter)
+        elif name in self.binds:
+            # Both would be sent as the one param, with either's value
+            raise UnsupportedCompilationError(
+                'Bind parameter %r conflicts with another of the same name; '
+                'make them unique' % name)
+
+        self.binds[name] = bindparam
+        self.bind_names.append(name)
+        self._bind_names_by_id[id(bindparam)] = name
+        return name
+
     def visit_match_piece(self, match_piece, **kw):
         text = ''
         if match_piece.variable:
@@ -314,6 +833,40 @@ class CypherCompiler(Compiler):
         text += ', '.join(pieces)
         return text
 
+    def visit_explain(self, explain, **kw):
+        return ('PROFILE' if explain.profile else 'EXPLAIN') + '\n' + \
+            explain.statement._compiler_dispatch(self, **kw)
+
+    def visit_call(self, call, **kw):
+        return 'CALL ' + call.procedure._compiler_dispatch(self, **kw)
+
+    def visit_create_index(self, index, **kw):
+        return 'CREATE INDEX ON :%s(%s)' % (index.label, index.name)
+
+    def visit_drop_index(self, index, **kw):
+        return 'DROP INDEX ON :%s(%s)' % (index.label, index.name)
+
+    def visit_create_unique_constraint(self, constraint, **kw):
+        return 'CREATE CONSTRAINT ON (n:%s) ASSERT n.%s IS UNIQUE' % (
+            constraint.label, constraint.name)
+
+    def visit_optional_match(self, match, **kw):
+        return 'OPTIONAL ' + self.visit_match(match, **kw)
+
+    def visit_using_index(self, using, **kw):
+        return 'USING INDEX %s%s:%s(%s)' % (
+            'SEEK ' if using.seek else '',
+            using.variable._compiler_dispatch(self, **kw),
+            using.label, using.name)
+
+    def visit_using_scan(self, using, **kw):
+        return 'USING SCAN %s:%s' % (
+            using.variable._compiler_dispatch(self, **kw), using.label)
+
+    def visit_cypher_options(self, options, **kw):
+        return 'CYPHER ' + ' '.join('%s=%s' % option
+                                    for option in options.options)
+
     def visit_return(self, return_, **kw):
         text = 'RETURN '
         exprs = [e._compiler_dispatch(self, **kw) for e in return_.expressions]
@@ -326,6 +879,60 @@ class CypherCompiler(Compiler):
         text += query.return_._compiler_dispatch(self, **kw)
         return text
 
+    def visit_statement(self, statement, **kw):
+        return '\n'.join(c._compiler_dispatch(self, **kw)
+                         for c in statement.clauses)
+
+    def visit_where(self, where, **kw):
+        criteria = [c._compiler_dispatch(self, **kw) for c in where.criteria]
+        return 'WHERE ' + ' AND '.join(criteria)
+
+    def visit_unwind(self, unwind, **kw):
+        return 'UNWIND %s AS %s' % (
+            unwind.expression._compiler_dispatch(self, **kw),
+            unwind.variable._compiler_dispatch(self, **kw))
+
+    def visit_create(self, create, **kw):
+        pieces = [p._compiler_dispatch(self, **kw) for p in create.pieces]
+        return 'CREATE ' + ', '.join(pieces)
+
+    def visit_with(self, with_, **kw):
+        exprs = [e._compiler_dispatch(self, **kw) for e in with_.expressions]
+        text = 'WITH DISTINCT ' if with_.distinct else 'WITH '
+        return text + ', '.join(exprs)
+
+    def visit_order_by(self, order_by, **kw):
+        exprs = [e._compiler_dispatch(self, **kw)
+                 for e in order_by.expressions]
+        return 'ORDER BY ' + ', '.join(exprs)
+
+    def visit_skip(self, skip, **kw):
+        return 'SKIP ' + skip.count._compiler_dispatch(self, **kw)
+
+    def visit_limit(self, limit, **kw):
+        return 'LIMIT ' + limit.count._compiler_dispatch(self, **kw)
+
+    def visit_delete(self, delete, **kw):
+        exprs = [e._compiler_dispatch(self, **kw) for e in delete.expressions]
+        text = 'DETACH DELETE ' if delete.detach else 'DELETE '
+        return text + ', '.join(exprs)
+
+    def visit_merge(self, merge, **kw):
+        text = 'MERGE ' + merge.pattern._compiler_dispatch(self, **kw)
+        if merge.on_create is not None:
+            text += '\nON CREATE ' + merge.on_create._compiler_dispatch(
+                self, **kw)
+        if merge.on_match is not None:
+            text += '\nON MATCH ' + merge.on_match._compiler_dispatch(
+                self, **kw)
+        return text
+
+    def visit_set_properties(self, set_properties, **kw):
+        return 'SET %s %s %s' % (
+            set_properties.variable._compiler_dispatch(self, **kw),
+            '+=' if set_properties.update else '=',
+            set_properties.expression._compiler_dispatch(self, **kw))
+
     def visit_variable(self, variable, **kw):
         name = variable.name
         if name is None:
@@ -334,7 +941,6 @@ class CypherCompiler(Compiler):
                 self.anon_vars[key] = 'anon_' + str(self.anon_counter)
                 self.anon_counter += 1
             name = self.anon_vars[key]
-            variable.name = name
 
         # keep track of variable names
         if name not in self.var_names:
@@ -343,8 +949,12 @@ class CypherCompiler(Compiler):
         return name
 
     def visit_bindparam(self, bindparam, **kw):
-        # TODO
-        raise NotImplementedError
+        if not self.parameterized:
+            return _literal_as_text(bindparam.value)._compiler_dispatch(
+                self, **kw)
+
+        name = self._bind_name(bindparam)
+        return self.bindtemplate % {'name': name}
 
     def visit_properties(self, properties, **kw):
         text = '{'
@@ -353,8 +963,13 @@ class CypherCompiler(Compiler):
             text += properties.variable._compiler_dispatch(self, **kw)
 
         if properties.props:
+            if self.parameterized:
+                items = properties.bound_props().items()
+            else:
+                items = properties.props.items()
+
             props = []
-            for key, value in list(properties.props.items()):
+            for key, value in sorted(items):
                 if not isinstance(key, util.string_types):
                     raise UnsupportedCompilationError(
                         'Properties keys must be strings', self, properties)
@@ -399,3 +1014,125 @@ class CypherCompiler(Compiler):
         text += ', '.join(elements)
         text += ']'
         return text
+
+    def visit_function_call(self, function_call, **kw):
+        args = [a._compiler_dispatch(self, **kw) for a in function_call.args]
+        text = function_call.name + '('
+        if function_call.distinct:
+            text += 'DISTINCT '
+        return text + ', '.join(args) + ')'
+
+    def visit_ordering(self, ordering, **kw):
+        text = ordering.expression._compiler_dispatch(self, **kw)
+        if ordering.descending:
+            text += ' DESC'
+        return text
+
+    def visit_property_access(self, property_access, **kw):
+        return (property_access.expression._compiler_dispatch(self, **kw) +
+                '.' + property_access.key)
+
+    def visit_alias(self, alias, **kw):
+        return '%s AS %s' % (alias.expression._compiler_dispatch(self, **kw),
+                             alias.name)
+
+    def visit_binary(self, binary, **kw):
+        return '%s %s %s' % (binary.left._compiler_dispatch(self, **kw),
+                             binary.operator,
+                             binary.right._compiler_dispatch(self, **kw))
+
+
+class CompiledStatement(object):
+    """The compiled form of a parameterized statement, without its values:
+    its Cypher, and how to build the params of any statement of its shape.
+
+    It keeps no reference to the statement it was compiled from, nor to its
+    bind values, so caching it doesn't keep them alive.
+    """
+
+    def __init__(self, compiler):
+        #: The compiled Cypher
+        self.string = compiler.compile()
+        if compiler.parameterized:
+            self._bind_positions, self._bind_count = \
+                compiler._get_bind_positions()
+        else:
+            self._bind_positions, self._bind_count = [], 0
+        self._bind_processors = compiler._get_bind_processors()
+
+    def compile(self):
+        return self.string
+
+    def construct_params(self, bindparams):
+        """Return a dict of bind names to processed values, taken from
+        bindparams, the BindParameters gathered by _gen_cache_key from a
+        statement of the compiled shape
+        """
+        if len(bindparams) != self._bind_count:
+            raise ArgumentError(
+                'Expected %d bind parameters from a statement of the '
+                'compiled shape, got %d' % (self._bind_count, len(bindparams)))
+        return _process_params(
+            [(name, bindparams[position])
+             for name, position in self._bind_positions],
+            self._bind_processors)
+
+
+def _process_params(bound, processors):
+    """Return a dict of bind names to the values of their BindParameters,
+    from bound pairs of them, processed by processors, keyed by bind name
+    """
+    params = {}
+    for name, bindparam in bound:
+        value = bindparam.value
+        processor = processors.get(name)
+        if processor is not None and value is not None:
+            value = processor(value)
+        params[name] = value
+    return params
+
+
+class CompiledCache(util.LRUCache):
+    """A bounded cache of CompiledStatements, keyed by the cache key of the
+    statement they were compiled from.
+
+    Statements of the same shape compile to the same Cypher, so a compiled
+    form found in the cache may be used in place of compiling the statement
+    again.
+    The number of cache hits and misses is tracked in :attr:`hits` and
+    :attr:`misses`.
+    """
+
+    def __init__(self, capacity=100, threshold=.5):
+        super(CompiledCache, self).__init__(capacity, threshold)
+        #: Number of lookups answered from the cache
+        self.hits = 0
+        #: Number of lookups which required compiling the statement
+        self.misses = 0
+
+    def compile(self, stmt, compiler_cls=CypherCompiler, parameterized=False):
+        """Return a CompiledStatement for stmt, compiling it only on a cache
+        miss, along with a dict of the statement's bind parameter values.
+
+        When parameterized, bind values are not part of the cache key, so
+        statements differing only in their values share a compiled form.
+        """
+        bindparams = BindCollector() if parameterized else None
+        key = (compiler_cls, parameterized, stmt._gen_cache_key(bindparams))
+        try:
+            compiled = self[key]
+        except KeyError:
+            self.misses += 1
+            compiled = self[key] = CompiledStatement(
+                compiler_cls(stmt, parameterized=parameterized))
+        else:
+            self.hits += 1
+
+        if bindparams is None:
+            return compiled, {}
+        return compiled, compiled.construct_params(bindparams)
+
+    def clear(self):
+        super(CompiledCache, self).clear()
+        self.hits = 0
+        self.misses = 0
@@ -20,7 +20,7 @@ class String(PropType):
     __visit_name__ = 'string'
 
     def bind_processor(self):
-        return str
+        return util.text_type
 
     def literal_processor(self):
         def processor(value):
@@ -29,7 +29,7 @@ class String(PropType):
         return processor
 
     def result_processor(self):
-        return str
+        return util.text_type
 
 
 class Boolean(PropType):
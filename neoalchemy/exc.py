@@ -12,3 +12,25 @@ class ArgumentError(CypherAlchemyError):
 
 class UnsupportedCompilationError(CypherAlchemyError):
     pass
+
+
+class TimeoutError(CypherAlchemyError):
+    """Raised when a connection pool times out on getting a connection."""
+
+
+class DatabaseError(CypherAlchemyError):
+    """Raised when the server reports an error running a statement.
+
+    The errors reported by the server are available as :attr:`errors`, a
+    list of dicts with ``code`` and ``message`` keys.
+    """
+
+    def __init__(self, message, errors=()):
+        super(DatabaseError, self).__init__(message)
+        self.errors = list(errors)
+
+
+class InvalidRequestError(CypherAlchemyError):
+    """Raised when an operation conflicts with the current state, e.g. adding
+    an instance to a Session already tracking another for the same node.
+    """
@@ -1,69 +1,1041 @@
-# FIXME: Stopgap measure to get a neo4j DB quickly
-from py2neo import neo4j
-db = neo4j.GraphDatabaseService('http://localhost:7474/db/data/')
-
+import functools
+import itertools
 import logging
 import operator
+import re
+import time
 
 from . import util, exc
 from .cypher import compiler, type_api
+from .engine import create_engine
+from .plan import Plan
+
+
+#: URL of the Engine used by queries not bound to another one
+DEFAULT_URL = 'http://localhost:7474/db/data/'
+
+_default_engine = None
+_default_engine_lock = util.threading.Lock()
+
+
+def get_default_engine():
+    """Return the Engine used by queries not bound to another one. Unless
+    set_default_engine() was called, it's created on first use, from
+    DEFAULT_URL.
+    """
+    global _default_engine
+    if _default_engine is None:
+        with _default_engine_lock:
+            if _default_engine is None:
+                _default_engine = create_engine(DEFAULT_URL)
+    return _default_engine
+
+
+def set_default_engine(engine):
+    """Use engine for queries not bound to another one"""
+    global _default_engine
+    _default_engine = engine
 
 
 NA_STATE_INSTANCE_VAR = '_neo_state'
+NA_ID_INSTANCE_VAR = '_neo_id'
 NA_NODE_INFO_INSTANCE_VAR = '_node_info'
 
 _instance_state = operator.attrgetter(NA_STATE_INSTANCE_VAR)
+_instance_id = operator.attrgetter(NA_ID_INSTANCE_VAR)
 _instance_info = operator.attrgetter(NA_NODE_INFO_INSTANCE_VAR)
 
+#: Holds the original values of the properties changed on an instance
+NA_COMMITTED_INSTANCE_VAR = '_neo_committed'
+#: Holds the related instances loaded through an instance's Rels
+NA_RELATED_INSTANCE_VAR = '_neo_related'
+#: Holds a weak reference to the Session an instance belongs to
+NA_SESSION_INSTANCE_VAR = '_neo_session'
+#: Marks instances loaded into a Session with only some of their properties
+NA_PARTIAL_INSTANCE_VAR = '_neo_partial'
+#: Holds the Engine an instance was loaded with, which loads its Rels
+NA_ENGINE_INSTANCE_VAR = '_neo_engine'
+
+#: Directions of a Rel, relative to the Node class declaring it
+OUTGOING = 'out'
+INCOMING = 'in'
+BOTH = 'both'
+
+#: Maps class names to the Node classes declared, so Rels may name their
+#: targets before they're declared
+_node_registry = {}
+
+#: The original value of a property which had no value
+NO_VALUE = util.symbol('NO_VALUE')
+
+
+def _instance_changes(instance):
+    """Return a dict of the properties of instance changed since it was
+    loaded or last written, mapped to their current values
+    """
+    committed = instance.__dict__.get(NA_COMMITTED_INSTANCE_VAR)
+    if not committed:
+        return {}
+
+    state = _instance_state(instance)
+    changes = {}
+    for key, original in committed.items():
+        value = state.get(key)
+        if original is NO_VALUE or value != original:
+            changes[key] = value
+    return changes
+
+
+def _commit_instance(instance):
+    """Mark the current values of instance's properties as written"""
+    instance.__dict__.pop(NA_COMMITTED_INSTANCE_VAR, None)
+
+
+def _related(instance):
+    """Return the dict of instance's loaded Rels, by key"""
+    related = instance.__dict__.get(NA_RELATED_INSTANCE_VAR)
+    if related is None:
+        related = instance.__dict__[NA_RELATED_INSTANCE_VAR] = {}
+    return related
+
+
+def _instance_session(instance):
+    """Return the Session instance belongs to, or None"""
+    ref = instance.__dict__.get(NA_SESSION_INSTANCE_VAR)
+    return ref() if ref is not None else None
+
+
+def _recording_engine(load, engine):
+    """Wrap load, a function returning an instance from a node id and its
+    properties, to record engine on each instance it returns
+    """
+    def load_with_engine(node_id, props):
+        instance = load(node_id, props)
+        instance.__dict__[NA_ENGINE_INSTANCE_VAR] = engine
+        return instance
+    return load_with_engine
+
+
+def _generative(fn):
+    """Mark a Query method as generative: it's applied to a copy of the
+    Query, and the copy is returned.
+    """
+    @functools.wraps(fn)
+    def generate(self, *args, **kwargs):
+        self = self._clone()
+        fn(self, *args, **kwargs)
+        return self
+    return generate
+
 
 class Query(object):
     """Keeps track of """
 
     logger = logging.getLogger(__name__ + '.Query')
 
+    #: Compiled statements shared by all queries, keyed by statement shape
+    compiled_cache = compiler.CompiledCache(capacity=500)
+
+    #: The yield_per() of queries loading into a session, unless given
+    session_yield_per = 100
+
     def __init__(self, *entities):
         #: The entities which will be returned by the query
         self.entities = entities
+        #: Number of records to read and load before returning any of their
+        #: results, or None to load each record as it's iterated over
+        self._yield_per = None
+        #: The Engine to run the query with, overriding the entities' own
+        self._engine = None
+        #: The Session whose identity map results are loaded into, if any
+        self._session = None
+        #: Expressions the query's results must all satisfy
+        self._criteria = ()
+        #: Expressions the query's results are sorted by
+        self._order_by = ()
+        #: The most results to return, or None for all of them
+        self._limit = None
+        #: The number of results to skip, or None
+        self._offset = None
+        #: Maps entities to the Props loaded into their instances, for those
+        #: not loading all their properties
+        self._load_props = {}
+        #: Props returned as KeyedTuples of values in place of the entities,
+        #: if values() was called
+        self._columns = None
+        #: Relationship patterns added to the MATCH by join()
+        self._patterns = ()
+        #: The classes joined, with the Variables they're bound to
+        self._joined = ()
+        #: Rels whose related instances are loaded along with the results
+        self._eager = ()
+        #: Planner hints, added to the MATCH
+        self._hints = ()
+        #: Options selecting the server's planner and runtime
+        self._execution_options = {}
+
+    def _clone(self):
+        q = self.__class__.__new__(self.__class__)
+        q.__dict__ = self.__dict__.copy()
+        return q
+
+    @_generative
+    def with_engine(self, engine):
+        """Run the query with engine, rather than the one its entities are
+        bound to
+        """
+        self._engine = engine
+
+    @_generative
+    def filter(self, *criteria):
+        """Restrict results to those satisfying all of criteria, expressions
+        built from props, e.g. ``Monkey.name == 'Bubbles'``. Values are sent
+        as parameters, and compared by the server.
+        """
+        for criterion in criteria:
+            if not isinstance(criterion, compiler.Element):
+                raise exc.ArgumentError(
+                    'Unsupported filter criterion %r' % (criterion,))
+        self._criteria = self._criteria + criteria
+
+    def filter_by(self, **kwargs):
+        """Restrict results to those whose props, named by keyword, equal
+        the values given
+        """
+        entity = self.entities[0]
+        info = _instance_info(entity)
+        criteria = []
+        for key, value in sorted(kwargs.items()):
+            prop = getattr(entity, key, None)
+            if not isinstance(prop, Prop):
+                prop = info.properties.get(key)
+            if prop is None:
+                raise exc.ArgumentError('%r is not a prop of %s' % (
+                    key, entity.__name__))
+            criteria.append(prop == value)
+        return self.filter(*criteria)
+
+    @_generative
+    def order_by(self, *criteria):
+        """Sort results by criteria, which may be props, expressions, or
+        orderings such as ``Monkey.name.desc()``. Passing None cancels any
+        sorting.
+        """
+        if len(criteria) == 1 and criteria[0] is None:
+            self._order_by = ()
+            return
+
+        order_by = []
+        for criterion in criteria:
+            if isinstance(criterion, Prop):
+                criterion = criterion.__clause_element__()
+            elif not isinstance(criterion, compiler.Element):
+                raise exc.ArgumentError(
+                    'Unsupported order_by criterion %r' % (criterion,))
+            order_by.append(criterion)
+        self._order_by = self._order_by + tuple(order_by)
+
+    @_generative
+    def limit(self, limit):
+        """Return at most limit results"""
+        if limit is not None and limit < 0:
+            raise exc.ArgumentError('limit must not be negative')
+        self._limit = limit
+
+    @_generative
+    def offset(self, offset):
+        """Skip the first offset results. Prefer iter_pages() for deep
+        pagination; the server still steps over every skipped result.
+        """
+        if offset is not None and offset < 0:
+            raise exc.ArgumentError('offset must not be negative')
+        self._offset = offset
+
+    def iter_pages(self, key=None, page_size=100):
+        """Generate lists of up to page_size results, paginated by key.
+
+        Each page is fetched with a query sorted by key, and restricted to
+        keys greater than the last key of the previous page, rather than by
+        skipping results, so every page costs the server the same, however
+        deep. key must be unique across results, else results sharing a key
+        across a page boundary are skipped.
+
+        :param key: The prop of the first entity to paginate by. Results
+          with no value for it are left out. If None, node ids are used.
+        """
+        query = self._paged(key, page_size)
+        page_query = query
+        while True:
+            page = page_query.all()
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            page_query = query._after(key, page[-1])
+
+    def _paged(self, key, page_size):
+        """Return this query sorted by key and limited to page_size results,
+        for iter_pages()
+        """
+        if page_size < 1:
+            raise exc.ArgumentError('page_size must be positive')
+        if self._order_by or self._limit is not None or \
+                self._offset is not None:
+            raise exc.InvalidRequestError(
+                'iter_pages() sorts and bounds the query itself; it may not '
+                'be combined with order_by(), limit() or offset()')
+
+        if key is None:
+            query = self.order_by(self._id_key())
+        else:
+            query = self.order_by(key).filter(key != None)
+        return query.limit(page_size)
+
+    def _id_key(self):
+        return compiler.FunctionCall('id', compiler.Variable(self.entities[0]))
+
+    def _after(self, key, last):
+        """Return this paged query restricted to results after last, the
+        last result of the previous page
+        """
+        if len(self.entities) > 1:
+            last = last[0]
+        if key is None:
+            criterion = compiler.BinaryExpression(
+                self._id_key(), '>',
+                compiler.BindParameter('last_key', _instance_id(last),
+                                       unique=True))
+        else:
+            criterion = key > _instance_state(last).get(key.name)
+        return self.filter(criterion)
+
+    @_generative
+    def load_only(self, *props):
+        """Load only props into the instances of their Nodes. Other props of
+        those Nodes read as None.
+        """
+        load_props = dict(self._load_props)
+        for prop in props:
+            entity = self._prop_entity(prop, 'load_only')
+            load_props[entity] = load_props.get(entity, ()) + (prop,)
+        self._load_props = load_props
+
+    @_generative
+    def defer(self, *props):
+        """Leave props out of the instances of their Nodes; they read as None.
+        Only the Nodes' other mapped props are loaded.
+        """
+        load_props = dict(self._load_props)
+        for prop in props:
+            entity = self._prop_entity(prop, 'defer')
+            loaded = load_props.get(entity)
+            if loaded is None:
+                info = _instance_info(entity)
+                loaded = tuple(p for key, p in sorted(info.properties.items()))
+            load_props[entity] = tuple(p for p in loaded if p is not prop)
+        self._load_props = load_props
+
+    def _prop_entity(self, prop, method):
+        if not isinstance(prop, Prop) or prop.parent not in self.entities:
+            raise exc.ArgumentError(
+                '%s() requires props of the entities queried, not %r' % (
+                    method, prop))
+        return prop.parent
+
+    def values(self, *props):
+        """Return an iterator of KeyedTuples of the values of props, labeled
+        by prop key, for each result. Only those properties are returned by
+        the server, and no instances are created.
+        """
+        if not props:
+            raise exc.ArgumentError('values() requires at least one prop')
+        for prop in props:
+            self._prop_entity(prop, 'values')
+        q = self._clone()
+        q._columns = props
+        return q._execute()
+
+    @_generative
+    def join(self, rel):
+        """Restrict results to those related through rel, a Rel of one of
+        the queried classes or of a class joined before.
+
+        The relationship is matched in the same pattern MATCH as the query's
+        entities, so traversals of any depth are a single query. Rels are
+        joined from the class's latest occurrence, so joining the same
+        self-referential Rel twice traverses two hops.
+
+        A target which is one of the queried entities is bound to it, so
+        ``Query(Monkey, Banana).join(Monkey.bananas)`` returns each monkey
+        with each of its bananas. Props of the target class, and of the Rel's
+        RelEntity, if any, may then be used in filter(), except where the
+        target's class was bound before, as with self-referential Rels; props
+        refer to the class's first occurrence.
+        """
+        if not isinstance(rel, Rel):
+            raise exc.ArgumentError('join() requires a Rel, not %r' % (rel,))
+
+        source = None
+        for node_type, variable in self._variables():
+            if node_type is rel.parent:
+                source = variable
+        if source is None:
+            raise exc.ArgumentError(
+                '%s.%s does not start from a class in the query' % (
+                    rel.parent.__name__, rel.key))
+
+        target_type = rel.target
+        joined = [node_type for node_type, variable in self._joined]
+        if target_type is rel.parent or target_type in joined:
+            # The class is bound already; give the target its own variable
+            target = compiler.Variable(
+                target_type, name='%s_%d' % (rel.key, len(self._joined) + 1))
+        else:
+            target = compiler.Variable(target_type)
+
+        joined = [(target_type, target)]
+        rel_variable = None
+        if rel.entity is not None:
+            if rel.entity in [node_type for node_type, v in self._joined]:
+                rel_variable = compiler.Variable(
+                    rel.entity,
+                    name='%s_rel_%d' % (rel.key, len(self._joined) + 1))
+            else:
+                rel_variable = compiler.Variable(rel.entity)
+            joined.append((rel.entity, rel_variable))
+
+        self._patterns = self._patterns + (
+            rel._pattern(source, target, rel_variable),)
+        self._joined = self._joined + tuple(joined)
+
+    @_generative
+    def with_hint(self, prop, hint='INDEX'):
+        """Hint that the planner should find the nodes of prop's class
+        through the index of prop, e.g. ``with_hint(Monkey.name, 'INDEX')``.
+
+        :param hint: 'INDEX', or 'INDEX SEEK' to require seeking the index.
+          The query must filter on prop, else the server rejects the hint.
+        """
+        if hint not in ('INDEX', 'INDEX SEEK'):
+            raise exc.ArgumentError('Unknown hint %r' % (hint,))
+        if not isinstance(prop, Prop):
+            raise exc.ArgumentError(
+                'with_hint() requires a prop, not %r' % (prop,))
+        self._hints = self._hints + (compiler.UsingIndex(
+            self._hint_variable(prop.parent), prop.parent.__label__,
+            prop.name, seek=hint == 'INDEX SEEK'),)
+
+    @_generative
+    def using_scan(self, node_type):
+        """Hint that the planner should find the nodes of node_type by
+        scanning its label
+        """
+        self._hints = self._hints + (compiler.UsingScan(
+            self._hint_variable(node_type), node_type.__label__),)
+
+    def _hint_variable(self, node_type):
+        for matched_type, variable in self._variables():
+            if matched_type is node_type:
+                return variable
+        raise exc.ArgumentError('%s is not matched by the query' % (
+            getattr(node_type, '__name__', node_type),))
+
+    @_generative
+    def execution_options(self, **options):
+        """Select how the server plans and runs the query, with the options
+        of a ``CYPHER`` prefix, e.g. ``execution_options(runtime='slotted')``.
+
+        :param runtime: The runtime executing the plan, such as 'slotted' or
+          'pipelined'.
+        :param planner: The planner, such as 'cost' or 'rule'.
+        """
+        for key, value in options.items():
+            if key not in _execution_options:
+                raise exc.ArgumentError('Unknown execution option %r' % key)
+            if not isinstance(value, util.string_types) or \
+                    not _option_value_re.match(value):
+                raise exc.ArgumentError(
+                    'Invalid value %r for execution option %r' % (value, key))
+        execution_options = dict(self._execution_options)
+        execution_options.update(options)
+        self._execution_options = execution_options
+
+    @_generative
+    def options(self, *options):
+        """Apply loader options, such as eager(), to the query"""
+        for option in options:
+            option.process_query(self)
+
+    def _variables(self):
+        """Return (class, Variable) pairs of the entities and joined classes
+        of the query, in the order they're matched
+        """
+        return ([(entity, compiler.Variable(entity))
+                 for entity in self.entities if issubclass(entity, Node)] +
+                list(self._joined))
+
+    @_generative
+    def _with_pattern(self, pattern, *criteria):
+        """Add a pattern to the MATCH, and criteria to the WHERE"""
+        self._patterns = self._patterns + (pattern,)
+        self._criteria = self._criteria + criteria
+
+    @_generative
+    def with_session(self, session):
+        """Load results into session, so each node is represented by a single
+        instance
+        """
+        self._session = session
+
+    def get_engine(self):
+        """Return the Engine this query will run with: the one given to
+        with_engine(), else the session's, else the first bound to one of the
+        entities, else the default engine
+        """
+        if self._engine is not None:
+            return self._engine
+        if self._session is not None and self._session.engine is not None:
+            return self._session.engine
+        for entity in self.entities:
+            if entity.__engine__ is not None:
+                return entity.__engine__
+        return get_default_engine()
+
+    @_generative
+    def yield_per(self, count):
+        """Load results in batches of count: each batch of records is read
+        and inflated, into the query's session if it has one, before any of
+        its results is returned.
+
+        Reading a Rel of an instance of a session loads it for all of the
+        session's instances, so over a session query it's loaded for a whole
+        batch with one query, rather than for each result. Records are still
+        streamed, so at most a batch of them is held at a time. Session
+        queries load batches of session_yield_per unless this is given.
+        """
+        if count < 1:
+            raise exc.ArgumentError('yield_per count must be positive')
+        self._yield_per = count
 
     def all(self):
         return list(self)
 
     def __iter__(self):
-        return iter(self._execute())
+        return self._execute()
 
-    def _execute(self):
-        match_pieces = []
-        return_pieces = []
-        for entity in self.entities:
-            variable = compiler.Variable(entity)
-            match_pieces.append(
-                compiler.Node(label=entity.__label__, variable=variable))
-            return_pieces.append(variable)
+    def count(self):
+        """Return the number of results, counted by the server.
+
+        Without filters or bounds, a single label's count is read from the
+        server's count store, rather than by scanning nodes.
+        """
+        return self._scalar(self._aggregate_statement(
+            compiler.FunctionCall('count', compiler.Raw('*'))))
+
+    def exists(self):
+        """Return whether the query has any results. The server stops at the
+        first.
+        """
+        return self._scalar(self._aggregate_statement(
+            compiler.BinaryExpression(
+                compiler.FunctionCall('count', compiler.Raw('*')), '>', 0),
+            limit=1))
+
+    def explain(self):
+        """Return the Plan the server would run the query with, without
+        running it. Its estimated rows are the planner's guesses.
+        """
+        return self._plan(compiler.Explain(self._statement()))
+
+    def profile(self):
+        """Run the query, discarding its results, and return the Plan it ran
+        with, along with the rows, db hits and page cache hits of each
+        operator
+        """
+        return self._plan(compiler.Explain(self._statement(), profile=True))
+
+    def _plan(self, stmt):
+        """Run stmt, returning the Plan of its result"""
+        result = _execute_statement(self.get_engine(), stmt)
+        result.fetchall()
+        return Plan.from_result(result.result)
+
+    def _only_entity(self, method):
+        if len(self.entities) != 1:
+            raise exc.InvalidRequestError(
+                '%s() requires a query of a single Node class' % method)
+        if self._order_by or self._limit is not None or \
+                self._offset is not None:
+            raise exc.InvalidRequestError(
+                '%s() may not be combined with order_by(), limit() or '
+                'offset()' % method)
+        return self.entities[0]
+
+    def _check_batch_size(self, batch_size):
+        if batch_size is not None and batch_size < 1:
+            raise exc.ArgumentError('batch_size must be positive')
+
+    def update(self, values, batch_size=None):
+        """Set properties on every node matched by the query, on the server,
+        without loading them. Instances already loaded are left as they are.
+
+        :param values: A dict of props, or prop keys, to their new values.
+          Other keys are set as properties of the same name.
+        :param batch_size: If given, the ids of the matched nodes are fetched
+          first, and the nodes are then updated by id in batches of this
+          many, each in its own transaction, so sets too large for a single
+          transaction can be updated. Only the first query matches, and
+          nodes matched by it are updated even if they've since changed.
+
+        Returns the number of nodes updated.
+        """
+        self._check_batch_size(batch_size)
+        engine = self.get_engine()
+        if batch_size is None:
+            stmt = self._update_statement(values)
+            return _execute_statement(engine, stmt).fetchall()[0][0]
+
+        node_ids = [row[0] for row in
+                    _execute_statement(engine, self._ids_statement())]
+        updated = 0
+        for start in range(0, len(node_ids), batch_size):
+            stmt = self._update_statement(
+                values, node_ids[start:start + batch_size])
+            updated += _execute_statement(engine, stmt).fetchall()[0][0]
+        return updated
 
-        match = compiler.Match(*match_pieces)
-        return_ = compiler.Return(*return_pieces)
-        query_node = compiler.Query(match=match, return_=return_)
+    def _ids_statement(self):
+        """Build the statement returning the id of each node matched by the
+        query, once
+        """
+        variable = compiler.Variable(self._only_entity('update'))
+        clauses = self._match_clauses()
+        clauses.extend([
+            compiler.With(variable, distinct=True),
+            compiler.Return(compiler.FunctionCall('id', variable)),
+        ])
+        return compiler.Statement(*clauses)
+
+    def _update_statement(self, values, node_ids=None):
+        """Build the statement of update(), or of its batch of the nodes with
+        ids among node_ids
+        """
+        entity = self._only_entity('update')
+        impl = entity._impl
+        info = _instance_info(entity)
+        props = {}
+        for key, value in values.items():
+            if not isinstance(key, Prop):
+                key = info.properties.get(key, key)
+            props[key.name if isinstance(key, Prop) else key] = value
+
+        variable = compiler.Variable(entity)
+        set_values = compiler.SetProperties(
+            variable,
+            compiler.BindParameter('values', impl.dehydrate(props),
+                                   unique=True),
+            update=True)
+        # Joined patterns may match a node on several rows; count it once
+        count = compiler.FunctionCall('count', variable, distinct=True)
+
+        if node_ids is None:
+            clauses = self._match_clauses()
+            clauses.extend([set_values, compiler.Return(count)])
+            return compiler.Statement(*clauses)
+
+        # Each node is found by id, rather than by matching the query again
+        node_id = compiler.Variable(None, 'node_id')
+        clauses = []
+        if self._execution_options:
+            clauses.append(compiler.CypherOptions(self._execution_options))
+        clauses.extend([
+            compiler.Unwind(compiler.BindParameter('node_ids', node_ids,
+                                                   unique=True), node_id),
+            compiler.Match(compiler.Node(label=entity.__label__,
+                                         variable=variable)),
+            compiler.Where(compiler.BinaryExpression(
+                compiler.FunctionCall('id', variable), '=', node_id)),
+            set_values,
+            compiler.Return(count),
+        ])
+        return compiler.Statement(*clauses)
+
+    def delete(self, detach=True, batch_size=None):
+        """Delete every node matched by the query, on the server, without
+        loading them. Instances already loaded are left as they are.
+
+        :param detach: Whether to delete the nodes' relationships along with
+          them. If False, deleting a node with relationships fails.
+        :param batch_size: If given, nodes are deleted in batches of this
+          many, each in its own transaction, so sets too large for a single
+          transaction can be deleted.
+
+        Returns the number of nodes deleted.
+        """
+        self._check_batch_size(batch_size)
+        stmt = self._delete_statement(detach, batch_size)
+        engine = self.get_engine()
+
+        deleted = 0
+        while True:
+            result = _execute_statement(engine, stmt)
+            result.fetchall()
+            count = (result.stats or {}).get('nodes_deleted', 0)
+            deleted += count
+            if batch_size is None or count < batch_size:
+                return deleted
+
+    def _delete_statement(self, detach, batch_size):
+        """Build the statement of delete(), run once per batch"""
+        entity = self._only_entity('delete')
+        variable = compiler.Variable(entity)
+        clauses = self._match_clauses()
+        if batch_size is not None:
+            # Joined patterns may match a node on several rows, which would
+            # each take a place in the batch
+            clauses.extend([
+                compiler.With(variable, distinct=True),
+                compiler.Limit(compiler.BindParameter(
+                    'batch_size', batch_size, unique=True)),
+            ])
+        clauses.append(compiler.Delete(variable, detach=detach))
+        return compiler.Statement(*clauses)
+
+    def _match_clauses(self, *criteria):
+        """Build the clauses matching the query's entities, restricted by its
+        filters and criteria, with its hints and execution options
+        """
+        # RelEntities are matched as part of joined patterns
+        match_pieces = [
+            compiler.Node(label=entity.__label__,
+                          variable=compiler.Variable(entity))
+            for entity in self.entities if issubclass(entity, Node)]
+        match_pieces.extend(self._patterns)
+
+        clauses = []
+        if self._execution_options:
+            clauses.append(compiler.CypherOptions(self._execution_options))
+        clauses.append(compiler.Match(*match_pieces))
+        clauses.extend(self._hints)
+        criteria = self._criteria + criteria
+        if criteria:
+            clauses.append(compiler.Where(*criteria))
+        return clauses
+
+    def _statement(self):
+        """Build the Cypher element tree representing this query.
+
+        Each entity is returned as its node id and its map of properties, so
+        results can be inflated without fetching anything more per node. If
+        only some props are to be loaded, the map holds just those.
+        """
+        if self._columns is not None:
+            return_pieces = [prop.__clause_element__()
+                             for prop in self._columns]
+        else:
+            return_pieces = []
+            for entity in self.entities:
+                variable = compiler.Variable(entity)
+                return_pieces.append(compiler.FunctionCall('id', variable))
+                load_props = self._load_props.get(entity)
+                if load_props is None:
+                    return_pieces.append(
+                        compiler.FunctionCall('properties', variable))
+                else:
+                    return_pieces.append(compiler.Properties(dict(
+                        (prop.name, prop.__clause_element__())
+                        for prop in load_props)))
 
-        comp = compiler.CypherCompiler(query_node)
+        clauses = self._match_clauses()
+        bounds = self._bound_clauses()
+        if self._columns is None and self._eager:
+            if self._order_by or bounds:
+                # Sort and bound the results before collecting their related
+                # nodes, so only those of the results returned are expanded
+                clauses.append(compiler.With(
+                    *[variable for node_type, variable in self._variables()]))
+                if self._order_by:
+                    clauses.append(compiler.OrderBy(*self._order_by))
+                clauses.extend(bounds)
+                bounds = []
+            clauses.extend(self._eager_clauses(return_pieces))
+        clauses.append(compiler.Return(*return_pieces))
+        if self._order_by:
+            # Aggregating the eager Rels doesn't keep the order of the rows
+            clauses.append(compiler.OrderBy(*self._order_by))
+        clauses.extend(bounds)
+        return compiler.Statement(*clauses)
+
+    def _eager_clauses(self, return_pieces):
+        """Build the clauses collecting the related nodes of each eager Rel,
+        adding the collected ids and properties to return_pieces.
+
+        Each Rel is collected by its own aggregation, grouped by the
+        variables bound before it, so eager Rels don't multiply each other's
+        rows, and the rows of the query stay as they'd be without them.
+        """
+        carried = [variable for node_type, variable in self._variables()]
+        clauses = []
+        for i, rel in enumerate(self._eager):
+            target = compiler.Variable(
+                rel.target, name='%s_eager_%d' % (rel.key, i + 1))
+            ids = compiler.Variable(None, '%s_ids_%d' % (rel.key, i + 1))
+            props = compiler.Variable(None, '%s_props_%d' % (rel.key, i + 1))
+            # collect() skips the nulls of parents with no related nodes
+            collected = [
+                compiler.Alias(compiler.FunctionCall(
+                    'collect', compiler.FunctionCall('id', target)),
+                    ids.name),
+                compiler.Alias(compiler.FunctionCall(
+                    'collect', compiler.FunctionCall('properties', target)),
+                    props.name),
+            ]
+            clauses.append(compiler.OptionalMatch(
+                rel._pattern(compiler.Variable(rel.parent), target)))
+            clauses.append(compiler.With(*(carried + collected)))
+            carried.extend([ids, props])
+            return_pieces.extend([ids, props])
+        return clauses
+
+    def _bound_clauses(self, limit=None):
+        """Build the SKIP and LIMIT clauses of the query. If limit is given,
+        it caps the query's own limit.
+        """
+        clauses = []
+        if self._offset is not None:
+            clauses.append(compiler.Skip(
+                compiler.BindParameter('offset', self._offset, unique=True)))
+        if limit is not None and self._limit is not None:
+            limit = min(limit, self._limit)
+        elif limit is None:
+            limit = self._limit
+        if limit is not None:
+            clauses.append(compiler.Limit(
+                compiler.BindParameter('limit', limit, unique=True)))
+        return clauses
+
+    def _aggregate_statement(self, expression, limit=None):
+        """Build a statement returning expression, aggregated over the query's
+        results. No properties are returned, and nothing is inflated.
+        """
+        clauses = self._match_clauses()
+        bounds = self._bound_clauses(limit)
+        if bounds:
+            clauses.append(compiler.With(
+                *[compiler.Variable(entity) for entity in self.entities]))
+            clauses.extend(bounds)
+        clauses.append(compiler.Return(expression))
+        return compiler.Statement(*clauses)
+
+    def _scalar(self, stmt):
+        """Run stmt, returning the first column of its first row"""
+        rows = _execute_statement(self.get_engine(), stmt).fetchall()
+        return rows[0][0] if rows else None
+
+    def _compile(self):
+        """Return the compiled form of this query, reusing a cached one if a
+        query of the same shape has been compiled before, and its params
+        """
+        return self.compiled_cache.compile(self._statement(),
+                                           parameterized=True)
+
+    def _execute(self):
+        """Generate inflated results, streaming records from the server"""
+        comp, params = self._compile()
         query_string = comp.compile()
-        self.logger.debug(query_string)
-        query = neo4j.CypherQuery(db, query_string)
+        self.logger.debug('%s %r', query_string, params)
 
-        results = query.execute()
-        inflated = []
-        for record in results.data:
-            # XXX: assuming only one column per record. prob not always true
-            column, value = record.columns[0], record.values[0]
-            node_type = comp.var_names[column].node_type
-            impl = node_type._impl
-            inflated.append(impl.inflate(value))
+        process = self._row_processor()
+        yield_per = self._batch_size()
+        result = self.get_engine().execute(query_string, params)
+        try:
+            if yield_per is None:
+                for row in result:
+                    yield process(row)
+            else:
+                rows = iter(result)
+                while True:
+                    batch = list(itertools.islice(rows, yield_per))
+                    if not batch:
+                        break
+                    for instance in [process(r) for r in batch]:
+                        yield instance
+        finally:
+            result.close()
+
+    def _batch_size(self):
+        """Return the number of records to load before returning any of
+        their results, or None to return each as it's loaded
+        """
+        if self._yield_per is None and self._session is not None and \
+                self._columns is None:
+            return self.session_yield_per
+        return self._yield_per
 
-        return inflated
+    def _values_processor(self):
+        processors = [prop.type_.result_processor() for prop in self._columns]
+        labels = [prop.key for prop in self._columns]
+
+        def process(row):
+            return util.KeyedTuple(
+                [processor(value)
+                 if processor is not None and value is not None else value
+                 for processor, value in zip(processors, row)],
+                labels)
+        return process
+
+    def _row_processor(self):
+        """Return a function turning a result row into a result.
+
+        A single entity is returned as an instance; multiple entities are
+        returned as KeyedTuples of instances, labeled by class name. If
+        values() was called, KeyedTuples of processed values are returned.
+        """
+        if self._columns is not None:
+            return self._values_processor()
+
+        engine = self.get_engine()
+        if self._session is None:
+            inflaters = [entity._impl.inflate for entity in self.entities]
+        else:
+            inflaters = [self._session._loader(
+                entity, partial=entity in self._load_props)
+                for entity in self.entities]
+        # Rels of the instances are loaded with the same engine
+        inflaters = [_recording_engine(inflate, engine)
+                     for inflate in inflaters]
+        if len(inflaters) == 1:
+            inflate = inflaters[0]
+
+            def process(row):
+                node_id, props = row
+                return inflate(node_id, props)
+        else:
+            labels = [entity.__name__ for entity in self.entities]
+
+            def process(row):
+                return util.KeyedTuple(
+                    [inflate(row[i * 2], row[i * 2 + 1])
+                     for i, inflate in enumerate(inflaters)],
+                    labels)
+
+        if self._eager:
+            process = self._eager_processor(process)
+        return process
+
+    def _eager_processor(self, process):
+        """Wrap process, storing the related instances collected for each
+        eager Rel on its parent instance, as if the Rel had been loaded
+        """
+        start = len(self.entities) * 2
+        single = len(self.entities) == 1
+        engine = self.get_engine()
+        loaders = []
+        for rel in self._eager:
+            if self._session is None:
+                load = rel.target._impl.inflate
+            else:
+                load = self._session._loader(rel.target)
+            load = _recording_engine(load, engine)
+            loaders.append((rel.key, self.entities.index(rel.parent), load))
+
+        def process_eager(row):
+            result = process(row[:start])
+            instances = (result,) if single else result
+            for i, (key, index, load) in enumerate(loaders):
+                ids = row[start + i * 2]
+                props = row[start + i * 2 + 1]
+                _related(instances[index])[key] = [
+                    load(node_id, p) for node_id, p in zip(ids, props)]
+            return result
+        return process_eager
+
+
+class EagerLoad(object):
+    """A loader option loading the related instances of a Rel along with the
+    results of a query; see :func:`eager`
+    """
+
+    def __init__(self, rel):
+        if not isinstance(rel, Rel):
+            raise exc.ArgumentError('eager() requires a Rel, not %r' % (rel,))
+        self.rel = rel
+
+    def process_query(self, query):
+        rel = self.rel
+        if rel.parent not in query.entities:
+            raise exc.ArgumentError(
+                '%s.%s does not start from an entity of the query' % (
+                    rel.parent.__name__, rel.key))
+        if rel not in query._eager:
+            query._eager = query._eager + (rel,)
+
+
+def eager(rel):
+    """Load the related instances of rel, a Rel of one of the queried
+    entities, in the same query as the entities, e.g.
+    ``Monkey.nodes.get_query().options(eager(Monkey.friends))``.
+
+    Related nodes are matched with OPTIONAL MATCH and collected per result,
+    so reading rel on each result needs no further query.
+    """
+    return EagerLoad(rel)
+
+
+def _fetch_by_key(query, keys, chunk_size):
+    """Run query for the nodes whose primary keys are keys, chunk_size keys
+    at a time, returning a dict of the instances found by key
+    """
+    impl = query.entities[0]._impl
+    keys = util.unique_list(keys)
+    found = {}
+    for start in range(0, len(keys), chunk_size):
+        chunk = keys[start:start + chunk_size]
+        for instance in query.filter(impl.primary_key_criterion(chunk)):
+            found[impl.primary_key(instance)] = instance
+    return found
+
+
+def _id_criterion(node_type, operator, value):
+    """Return an expression comparing the node id of node_type's variable to
+    value, sent as a parameter
+    """
+    return compiler.BinaryExpression(
+        compiler.FunctionCall('id', compiler.Variable(node_type)), operator,
+        compiler.BindParameter('node_id', value, unique=True))
+
+
+#: Names of the options Query.execution_options() accepts
+_execution_options = frozenset(['runtime', 'planner'])
+
+_option_value_re = re.compile(r'^\w+$')
+
+
+def _def_line(name, args, namespace):
+    """Return the def line of a generated function taking args, with each
+    name of namespace bound as a default argument, read as a local
+    """
+    defaults = ['%s=%s' % (key, key) for key in sorted(namespace)]
+    return 'def %s(%s):' % (name, ', '.join(args + defaults))
+
+
+def _rate(count, seconds):
+    return count / seconds if seconds > 0 else 0.0
+
+
+def _execute_statement(engine, stmt):
+    """Compile stmt, reusing the compiled form of statements of the same
+    shape, and run it with engine, returning the ResultProxy
+    """
+    comp, params = Query.compiled_cache.compile(stmt, parameterized=True)
+    return engine.execute(comp.compile(), params)
 
 
 class NodeManager(object):
     """Handles creation of query from simple methods"""
 
+    logger = logging.getLogger(__name__ + '.NodeManager')
+
     query_class = Query
 
     def __init__(self, node_type=None):
@@ -76,9 +1048,173 @@ class NodeManager(object):
     def get_query(self):
         return self.query_class(self.node_type)
 
+    def filter(self, *criteria):
+        return self.get_query().filter(*criteria)
+
+    def filter_by(self, **kwargs):
+        return self.get_query().filter_by(**kwargs)
+
+    def order_by(self, *criteria):
+        return self.get_query().order_by(*criteria)
+
+    def count(self):
+        return self.get_query().count()
+
+    def get(self, key, session=None):
+        """Return the instance whose primary key is key, or None if there's
+        no such node of this class. Nodes are keyed by their primary key
+        prop, else by node id.
+
+        If session is given, the lookup goes through its batch loader, so the
+        node is loaded along with any keys pending there, if it isn't in the
+        session already.
+        """
+        if session is not None:
+            return session.get(self.node_type, key)
+        return self.get_many([key])[0]
+
+    def get_many(self, keys, chunk_size=1000, session=None):
+        """Return a list of the instances whose primary keys are keys, in the
+        order of keys, with None for those not found.
+
+        Nodes are looked up with an ``IN`` query per chunk_size keys; index
+        the primary key prop to keep them from scanning the label. If session
+        is given, keys of instances already in it aren't looked up.
+        """
+        if chunk_size < 1:
+            raise exc.ArgumentError('chunk_size must be positive')
+        keys = list(keys)
+        if session is not None:
+            return session.get_many(self.node_type, keys, chunk_size)
+        found = _fetch_by_key(self.get_query(), keys, chunk_size)
+        return [found.get(key) for key in keys]
+
     def all(self):
         return self.get_query().all()
 
+    def bulk_create(self, iterable, batch_size=1000):
+        """Create a node for each item of iterable, which may hold dicts of
+        properties or instances of the Node class, batch_size at a time.
+
+        Each batch is sent as a single UNWIND statement, and iterable is
+        consumed lazily, so it may be a generator of any length. Instances
+        are assigned the ids of their new nodes. The throughput of each batch
+        is logged at DEBUG level, and of the whole run at INFO level.
+
+        Returns the number of nodes created.
+        """
+        impl = self.node_type._impl
+        count, stats = self._bulk_write(iterable, batch_size,
+                                        impl.create_statement, 'Created')
+        return stats.get('nodes_created', count)
+
+    def bulk_merge(self, iterable, on, batch_size=1000):
+        """Create or update a node for each item of iterable, which may hold
+        dicts of properties or instances of the Node class, batch_size at a
+        time.
+
+        Nodes are matched on the props named by on, a sequence of prop keys
+        or Props of the Node class. A matched node has the item's properties
+        merged into its own; otherwise, a node is created with them. Each
+        batch is sent as a single UNWIND ... MERGE statement, and iterable is
+        consumed lazily, as with :meth:`bulk_create`.
+
+        Returns a KeyedTuple of the number of nodes created and matched.
+        """
+        impl = self.node_type._impl
+        merge_names = [prop.name for prop in self._merge_props(on)]
+
+        def statement(rows, return_ids):
+            for row in rows:
+                for name in merge_names:
+                    if row.get(name) is None:
+                        raise exc.ArgumentError(
+                            'Row %r has no value for merge key %r' % (
+                                row, name))
+            return impl.merge_statement(rows, merge_names, return_ids)
+
+        count, stats = self._bulk_write(iterable, batch_size, statement,
+                                        'Merged')
+        created = stats.get('nodes_created', 0)
+        return util.KeyedTuple([created, count - created],
+                               ['created', 'matched'])
+
+    def _merge_props(self, on):
+        """Return the Props named by on, a key or Prop or a sequence of them"""
+        if isinstance(on, util.string_types + (Prop,)):
+            on = (on,)
+
+        info = _instance_info(self.node_type)
+        props = []
+        for key in on:
+            prop = key if isinstance(key, Prop) else info.properties.get(key)
+            if prop is None or info.properties.get(prop.key) is not prop:
+                raise exc.ArgumentError('%r is not a prop of %s' % (
+                    key, self.node_type.__name__))
+            props.append(prop)
+        if not props:
+            raise exc.ArgumentError('At least one merge key is required')
+        return props
+
+    def _bulk_write(self, iterable, batch_size, statement, verb):
+        """Run a statement for each batch of items of iterable.
+
+        Items are dehydrated into rows, and statement(rows, return_ids) is
+        called to build each batch's statement. If a batch holds instances,
+        the statement must return node ids, in the order of rows, and they're
+        assigned to the instances.
+
+        Returns the number of items written, and a dict of the statements'
+        stats, summed.
+        """
+        if batch_size < 1:
+            raise exc.ArgumentError('batch_size must be positive')
+
+        node_type = self.node_type
+        impl = node_type._impl
+        engine = impl.get_engine()
+        items = iter(iterable)
+
+        written = 0
+        stats = {}
+        start = time.time()
+        while True:
+            batch = list(itertools.islice(items, batch_size))
+            if not batch:
+                break
+
+            batch_start = time.time()
+            instances = [item for item in batch
+                         if isinstance(item, node_type)]
+            rows = [impl.dehydrate(_instance_state(item)
+                                   if isinstance(item, node_type) else item)
+                    for item in batch]
+            result = _execute_statement(
+                engine, statement(rows, bool(instances)))
+            node_ids = [row[0] for row in result]
+
+            if instances:
+                # Nodes are written, and their ids returned, in batch order
+                for item, node_id in zip(batch, node_ids):
+                    if isinstance(item, node_type):
+                        setattr(item, NA_ID_INSTANCE_VAR, node_id)
+                        _commit_instance(item)
+
+            for key, value in (result.stats or {}).items():
+                if not isinstance(value, bool):
+                    stats[key] = stats.get(key, 0) + value
+
+            written += len(batch)
+            self.logger.debug('%s %d %s nodes (%.0f rows/s)',
+                              verb, len(batch), node_type.__name__,
+                              _rate(len(batch), time.time() - batch_start))
+
+        self.logger.info('%s %d %s nodes in %.2fs (%.0f rows/s)',
+                         verb, written, node_type.__name__,
+                         time.time() - start,
+                         _rate(written, time.time() - start))
+        return written, stats
+
 
 class NodeInfo(object):
     """Stores metadata about a Node"""
@@ -86,13 +1222,40 @@ class NodeInfo(object):
     def __init__(self, node_type):
         self.node_type = node_type
         self.properties = {}
+        self.relationships = {}
 
     def add_property(self, prop):
+        if prop.primary_key:
+            primary_key = self.primary_key
+            if primary_key is not None and primary_key.key != prop.key:
+                raise exc.ArgumentError(
+                    '%s already has a primary key prop, %r' % (
+                        self.node_type.__name__, primary_key.key))
         prop._set_parent(self.node_type)
         self.properties[prop.key] = prop
+        self._mapping_changed()
+
+    def add_relationship(self, rel):
+        rel._set_parent(self.node_type)
+        self.relationships[rel.key] = rel
 
     def remove_property(self, prop):
         del self.properties[prop.key]
+        self._mapping_changed()
+
+    def _mapping_changed(self):
+        """Discard anything precomputed from the properties mapping"""
+        impl = self.node_type.__dict__.get('_impl')
+        if isinstance(impl, NodeImpl):
+            impl.reset()
+
+    @property
+    def primary_key(self):
+        """The Prop declared with primary_key=True, or None"""
+        for prop in self.properties.values():
+            if prop.primary_key:
+                return prop
+        return None
 
     @property
     def result_processors(self):
@@ -107,11 +1270,10 @@ class NodeInfo(object):
 class NodeMeta(type):
     def __init__(cls, clsname, bases, clsdict):
         if (clsname != 'NodeMeta' and hasattr(cls, '__label__') and
-                    clsname != 'Node'):
+                    clsname not in ('Node', 'RelEntity')):
             if cls.__label__ is None and bases != (object,):
                 cls.__label__ = clsname
-
-            setattr(cls, NA_STATE_INSTANCE_VAR, {})
+            _node_registry[clsname] = cls
 
             info = NodeInfo(cls)
             setattr(cls, NA_NODE_INFO_INSTANCE_VAR, info)
@@ -129,8 +1291,14 @@ class NodeMeta(type):
                     attr._set_node_type(cls)
                 elif isinstance(attr, Prop):
                     if attr.name is None:
-                        attr.name = name
+                        attr._set_name(name)
                     info.add_property(attr)
+                elif isinstance(attr, Rel):
+                    attr._set_key(name)
+                    info.add_relationship(attr)
+
+            if isinstance(cls._impl, NodeImpl):
+                cls._impl.configure()
 
         type.__init__(cls, clsname, bases, clsdict)
 
@@ -139,6 +1307,10 @@ class Prop(object):
     def __init__(self, *args, **kwargs):
         name = kwargs.pop('name', None)
         type_ = kwargs.pop('type_', None)
+        key = kwargs.pop('key', None)
+        primary_key = kwargs.pop('primary_key', False)
+        index = kwargs.pop('index', False)
+        unique = kwargs.pop('unique', False)
         args = list(args)
         if args:
             if isinstance(args[0], util.string_types):
@@ -157,12 +1329,22 @@ class Prop(object):
 
         self.type_ = type_api.to_instance(type_)
         self.name = name
-        self.key = kwargs.pop('key', name)
+        self.key = key or name
+        #: Whether the prop identifies its Node, for NodeManager.get(). A
+        #: primary key is unique.
+        self.primary_key = primary_key
+        #: Whether the prop is indexed, by schema.create_all()
+        self.index = index
+        #: Whether no two nodes may share a value of the prop, enforced by a
+        #: constraint made by schema.create_all()
+        self.unique = unique or primary_key
 
         self.parent = None
 
     def _set_name(self, name):
         self.name = name
+        if self.key is None:
+            self.key = name
 
     def _set_parent(self, parent):
         self.parent = parent
@@ -171,10 +1353,95 @@ class Prop(object):
         if instance is None:
             return self
         else:
-            return instance._state.get(self.name)
+            return _instance_state(instance).get(self.name)
+
+    # Props compare into expressions, but are still used as dict keys
+    __hash__ = object.__hash__
+
+    def __clause_element__(self):
+        """Return the expression for this prop of its Node in a query"""
+        return compiler.PropertyAccess(compiler.Variable(self.parent),
+                                       self.name)
+
+    def _bind(self, value):
+        return compiler.BindParameter(self.name, value, type_=self.type_,
+                                      unique=True)
+
+    def _compare(self, operator, other):
+        if isinstance(other, Prop):
+            other = other.__clause_element__()
+        elif not isinstance(other, compiler.Element):
+            other = self._bind(other)
+        return compiler.BinaryExpression(self.__clause_element__(), operator,
+                                         other)
+
+    def __eq__(self, other):
+        if other is None:
+            return compiler.BinaryExpression(
+                self.__clause_element__(), 'IS', compiler.Raw('NULL'))
+        return self._compare('=', other)
+
+    def __ne__(self, other):
+        if other is None:
+            return compiler.BinaryExpression(
+                self.__clause_element__(), 'IS NOT', compiler.Raw('NULL'))
+        return self._compare('<>', other)
+
+    def __lt__(self, other):
+        return self._compare('<', other)
+
+    def __le__(self, other):
+        return self._compare('<=', other)
+
+    def __gt__(self, other):
+        return self._compare('>', other)
+
+    def __ge__(self, other):
+        return self._compare('>=', other)
+
+    def between(self, lower, upper):
+        """Return an expression true when the prop is within lower and upper,
+        inclusive
+        """
+        return compiler.BinaryExpression(self >= lower, 'AND', self <= upper)
+
+    def in_(self, values):
+        """Return an expression true when the prop equals one of values"""
+        processor = self.type_.bind_processor()
+        if processor is not None:
+            values = [processor(v) if v is not None else v for v in values]
+        values = compiler.BindParameter(self.name, list(values), unique=True)
+        return compiler.BinaryExpression(self.__clause_element__(), 'IN',
+                                         values)
+
+    def asc(self):
+        return compiler.Ordering(self.__clause_element__())
+
+    def desc(self):
+        return compiler.Ordering(self.__clause_element__(), descending=True)
+
+    def startswith(self, other):
+        return self._compare('STARTS WITH', other)
+
+    def endswith(self, other):
+        return self._compare('ENDS WITH', other)
+
+    def contains(self, other):
+        return self._compare('CONTAINS', other)
 
     def __set__(self, instance, value):
         state = _instance_state(instance)
+        committed = instance.__dict__.get(NA_COMMITTED_INSTANCE_VAR)
+        if committed is None:
+            committed = instance.__dict__[NA_COMMITTED_INSTANCE_VAR] = {}
+            # The session holds instances weakly, save those it has to flush
+            session = _instance_session(instance)
+            if session is not None and _instance_id(instance) is not None:
+                session._dirty.add(instance)
+        if self.name not in committed:
+            # Keep the value as of the last load or write, to tell whether
+            # the property has really changed
+            committed[self.name] = state.get(self.name, NO_VALUE)
         state[self.name] = value
 
     @property
@@ -189,36 +1456,305 @@ class Prop(object):
         return processor
 
 
+class Rel(object):
+    """Declares a relationship from a Node class to a target Node class.
+
+    On an instance, a Rel reads as the list of its related instances, loaded
+    the first time it's accessed, with the engine the instance was loaded
+    with. On the class, it may be passed to Query.join().
+
+    :param type_: The relationship type, or a RelEntity class mapping the
+      relationship's properties.
+    :param target: The target Node class, or its class name, for targets
+      declared later.
+    :param direction: OUTGOING, INCOMING or BOTH, relative to the declaring
+      class.
+    """
+
+    def __init__(self, type_, target, direction=OUTGOING):
+        if direction not in (OUTGOING, INCOMING, BOTH):
+            raise exc.ArgumentError('Unknown direction %r' % (direction,))
+
+        if isinstance(type_, type) and issubclass(type_, RelEntity):
+            #: The RelEntity mapping the relationship's properties, if any
+            self.entity = type_
+            type_ = type_.__label__
+        else:
+            self.entity = None
+        #: The relationship type
+        self.type_ = type_
+        self.direction = direction
+        self._target = target
+
+        self.key = None
+        self.parent = None
+
+    def _set_key(self, key):
+        self.key = key
+
+    def _set_parent(self, parent):
+        self.parent = parent
+
+    @property
+    def target(self):
+        """The target Node class"""
+        if isinstance(self._target, util.string_types):
+            try:
+                self._target = _node_registry[self._target]
+            except KeyError:
+                raise exc.ArgumentError(
+                    'Rel %s.%s targets unknown Node class %r' % (
+                        self.parent.__name__, self.key, self._target))
+        return self._target
+
+    def _pattern(self, source, target, rel_variable=None):
+        """Build the pattern relating the source and target Variables"""
+        if self.direction == INCOMING:
+            left, right = compiler.RelType.left(), compiler.RelType()
+        elif self.direction == OUTGOING:
+            left, right = compiler.RelType(), compiler.RelType.right()
+        else:
+            left, right = compiler.RelType(), compiler.RelType()
+        return compiler.Relationship(
+            compiler.Node(variable=source),
+            left,
+            compiler.RelPiece(label=self.type_, variable=rel_variable),
+            right,
+            compiler.Node(label=self.target.__label__, variable=target))
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        related = _related(instance)
+        if self.key not in related:
+            engine = instance.__dict__.get(NA_ENGINE_INSTANCE_VAR)
+            if getattr(engine, 'is_async', False):
+                raise exc.InvalidRequestError(
+                    '%s.%s of an instance loaded asynchronously must be '
+                    'loaded with eager()' % (self.parent.__name__, self.key))
+            session = _instance_session(instance)
+            if session is not None and _instance_id(instance) is not None:
+                # Load the Rel of the session's other instances along with it
+                session._load_related(self, instance, engine)
+            else:
+                related[self.key] = self._load(instance, engine)
+        return related[self.key]
+
+    def _load(self, instance, engine=None):
+        """Query the instances related to instance, with engine if given"""
+        node_id = _instance_id(instance)
+        if node_id is None:
+            return []
+
+        source = compiler.Variable(self.parent, name='source')
+        query = Query(self.target)
+        if engine is not None:
+            query = query.with_engine(engine)
+        return query._with_pattern(
+            self._pattern(source, compiler.Variable(self.target)),
+            compiler.BinaryExpression(
+                compiler.FunctionCall('id', source), '=',
+                compiler.BindParameter('source_id', node_id,
+                                       unique=True))).all()
+
+
 class NodeImpl(object):
     """Handles various operations for Nodes"""
 
     def __init__(self, node_type):
         self.node_type = node_type
+        self._inflater = None
+        self._dehydrater = None
 
-    def inflate(self, node):
-        """Given a result from the database, return a Node which represents it
-        """
-        instance = self.node_type()
-        # XXX: assumes it's a neo4j.Node
-        props = node.get_properties()
-        _info = _instance_info(instance)
-        _processors = _info.result_processors
-        for key, value in list(props.items()):
-            if key in _processors:
-                props[key] = _processors[key](value)
-        instance._state = props
-        return instance
+    def configure(self):
+        """Precompute everything derived from the Node's properties"""
+        self._inflater = self._create_inflater()
+        self._dehydrater = self._create_dehydrater()
+
+    def reset(self):
+        """Discard precomputed state; it's rebuilt when next needed"""
+        self._inflater = None
+        self._dehydrater = None
+
+    def get_engine(self):
+        """Return the Engine the Node is bound to, else the default engine"""
+        if self.node_type.__engine__ is not None:
+            return self.node_type.__engine__
+        return get_default_engine()
+
+    def inflate(self, node_id, props):
+        """Given a node's id and its dict of properties, as returned in a
+        result row, return a Node which represents it
+        """
+        inflater = self._inflater
+        if inflater is None:
+            self.configure()
+            inflater = self._inflater
+        return inflater(node_id, props)
+
+    def dehydrate(self, props):
+        """Given a dict of a node's properties, return a copy of it to be
+        sent to the server, with each value processed by its prop type's
+        bind_processor
+        """
+        dehydrater = self._dehydrater
+        if dehydrater is None:
+            self.configure()
+            dehydrater = self._dehydrater
+        return dehydrater(props)
+
+    def primary_key(self, instance):
+        """Return the primary key of instance: the value of its primary key
+        prop, else its node id
+        """
+        prop = _instance_info(self.node_type).primary_key
+        if prop is None:
+            return _instance_id(instance)
+        return _instance_state(instance).get(prop.name)
+
+    def primary_key_criterion(self, keys):
+        """Return an expression true for the nodes whose primary key is one
+        of keys
+        """
+        prop = _instance_info(self.node_type).primary_key
+        if prop is None:
+            return _id_criterion(self.node_type, 'IN', list(keys))
+        return prop.in_(keys)
+
+    def create_statement(self, rows, return_ids=True):
+        """Return a statement creating a node for each of rows, a list of
+        dehydrated property dicts.
+
+        :param return_ids: Whether to return the new nodes' ids, in the order
+          of rows.
+        """
+        row = compiler.Variable(None, 'row')
+        node = compiler.Variable(self.node_type)
+        clauses = [
+            compiler.Unwind(compiler.BindParameter('rows', rows), row),
+            compiler.Create(
+                compiler.Node(label=self.node_type.__label__, variable=node)),
+            compiler.SetProperties(node, row),
+        ]
+        if return_ids:
+            clauses.append(compiler.Return(compiler.FunctionCall('id', node)))
+        return compiler.Statement(*clauses)
+
+    def merge_statement(self, rows, on, return_ids=True):
+        """Return a statement merging a node for each of rows, a list of
+        dehydrated property dicts, matched on the properties named in on.
+        New nodes are given the row's properties; matched nodes have them
+        merged into their own.
+
+        :param return_ids: Whether to return the nodes' ids, in the order of
+          rows.
+        """
+        row = compiler.Variable(None, 'row')
+        node = compiler.Variable(self.node_type)
+        match_props = compiler.Properties(dict(
+            (name, compiler.PropertyAccess(row, name)) for name in on))
+        clauses = [
+            compiler.Unwind(compiler.BindParameter('rows', rows), row),
+            compiler.Merge(
+                compiler.Node(label=self.node_type.__label__, variable=node,
+                              properties=match_props),
+                on_create=compiler.SetProperties(node, row),
+                on_match=compiler.SetProperties(node, row, update=True)),
+        ]
+        if return_ids:
+            clauses.append(compiler.Return(compiler.FunctionCall('id', node)))
+        return compiler.Statement(*clauses)
+
+    def _create_inflater(self):
+        """Generate a function which builds an instance of the Node from its
+        id and a dict of its properties, processing each value with its prop
+        type's result_processor.
+
+        The class and processors are bound as default arguments of the
+        generated function, so its body reads them as locals. The instance is
+        created with __new__, skipping __init__.
+        """
+        namespace = {'node_type': self.node_type}
+        lines = ['    instance = node_type.__new__(node_type)']
+
+        info = _instance_info(self.node_type)
+        for i, (key, prop) in enumerate(sorted(info.properties.items())):
+            processor = prop.type_.result_processor()
+            if processor is None:
+                continue
+            processor_name = 'processor_%d' % i
+            namespace[processor_name] = processor
+            lines.extend([
+                '    value = props.get(%r)' % prop.name,
+                '    if value is not None:',
+                '        props[%r] = %s(value)' % (prop.name, processor_name),
+            ])
+
+        lines.extend([
+            '    instance.%s = node_id' % NA_ID_INSTANCE_VAR,
+            '    instance.%s = props' % NA_STATE_INSTANCE_VAR,
+            '    return instance',
+        ])
+        lines.insert(0, _def_line('inflate', ['node_id', 'props'], namespace))
+        exec(compile('\n'.join(lines), '<inflate %s>' % self.key, 'exec'),
+             namespace)
+        return namespace['inflate']
+
+    def _create_dehydrater(self):
+        """Generate a function which copies a dict of the Node's properties,
+        processing each value with its prop type's bind_processor
+        """
+        namespace = {}
+        lines = ['    row = dict(props)']
+
+        info = _instance_info(self.node_type)
+        for i, (key, prop) in enumerate(sorted(info.properties.items())):
+            processor = prop.type_.bind_processor()
+            if processor is None:
+                continue
+            processor_name = 'processor_%d' % i
+            namespace[processor_name] = processor
+            lines.extend([
+                '    value = row.get(%r)' % prop.name,
+                '    if value is not None:',
+                '        row[%r] = %s(value)' % (prop.name, processor_name),
+            ])
+
+        lines.append('    return row')
+        lines.insert(0, _def_line('dehydrate', ['props'], namespace))
+        exec(compile('\n'.join(lines), '<dehydrate %s>' % self.key, 'exec'),
+             namespace)
+        return namespace['dehydrate']
 
     @property
     def key(self):
         return self.node_type.__module__ + '.' + self.node_type.__name__
 
 
-class BaseNode(object):
-    __metaclass__ = NodeMeta
-    nodes = NodeManager
+class BaseNode(util.with_metaclass(NodeMeta, object)):
+    #: The Engine queries of this Node run with. If None, the default engine
+    #: is used.
+    __engine__ = None
+
+    def __init__(self):
+        setattr(self, NA_ID_INSTANCE_VAR, None)
+        setattr(self, NA_STATE_INSTANCE_VAR, {})
 
 
 class Node(BaseNode):
     """Base class for OGM Nodes"""
     __label__ = None
+
+    nodes = NodeManager
+
+
+class RelEntity(BaseNode):
+    """Base class for mapping the properties of relationships, given to a Rel
+    in place of its type. Its __label__ is the relationship type, and
+    defaults to the class name.
+
+    A RelEntity may be queried along with Nodes, once joined:
+    ``Query(Monkey, Friendship).join(Monkey.friends)``.
+    """
+    __label__ = None
@@ -0,0 +1,144 @@
+"""Query plans, as returned by the server for EXPLAIN and PROFILE"""
+
+from . import exc
+
+
+#: Operators which usually mean a query is missing a label, an index or a
+#: relationship between its patterns
+FLAGGED_OPERATORS = {
+    'AllNodesScan': 'scans every node in the graph',
+    'CartesianProduct': 'pairs every row of one pattern with every row of '
+                        'another',
+}
+
+_counter_keys = {
+    'estimated_rows': 'EstimatedRows',
+    'rows': 'Rows',
+    'db_hits': 'DbHits',
+    'page_cache_hits': 'PageCacheHits',
+    'page_cache_misses': 'PageCacheMisses',
+}
+
+
+class Plan(object):
+    """An operator of a query plan, with the operators feeding it rows.
+
+    Counters the server didn't report are None; only PROFILE reports rows,
+    db hits and page cache hits and misses.
+    """
+
+    def __init__(self, operator, identifiers=(), arguments=None,
+                 children=(), estimated_rows=None, rows=None, db_hits=None,
+                 page_cache_hits=None, page_cache_misses=None):
+        #: The operator's name, e.g. 'NodeIndexSeek'
+        self.operator = operator
+        #: Variables the operator's rows hold
+        self.identifiers = list(identifiers)
+        #: Other details of the operator, such as its expressions
+        self.arguments = arguments or {}
+        #: Plans of the operators feeding this one
+        self.children = list(children)
+        self.estimated_rows = estimated_rows
+        self.rows = rows
+        self.db_hits = db_hits
+        self.page_cache_hits = page_cache_hits
+        self.page_cache_misses = page_cache_misses
+
+    @classmethod
+    def from_result(cls, result):
+        """Build the Plan of a statement's result, as returned by the
+        transactional endpoint
+        """
+        plan = (result or {}).get('plan') or (result or {}).get('profile')
+        if not plan:
+            raise exc.DatabaseError('The server returned no plan')
+        return cls.from_dict(plan.get('root', plan))
+
+    @classmethod
+    def from_dict(cls, operator):
+        """Build a Plan from the server's description of an operator"""
+        # Some servers nest the details in "arguments", others inline them.
+        # Operator names may be suffixed with "@" and the database's name.
+        arguments = dict(operator.get('arguments') or {})
+        for key, value in operator.items():
+            if key not in ('operatorType', 'identifiers', 'children',
+                           'arguments'):
+                arguments[key] = value
+
+        kwargs = {}
+        for attr, key in _counter_keys.items():
+            kwargs[attr] = arguments.pop(key, None)
+
+        return cls(operator.get('operatorType', '').split('@')[0],
+                   identifiers=operator.get('identifiers') or (),
+                   arguments=arguments,
+                   children=[cls.from_dict(child)
+                             for child in operator.get('children') or ()],
+                   **kwargs)
+
+    def __repr__(self):
+        return 'Plan(%r, %d children)' % (self.operator, len(self.children))
+
+    def walk(self):
+        """Generate this operator and those feeding it, depth first"""
+        yield self
+        for child in self.children:
+            for plan in child.walk():
+                yield plan
+
+    @property
+    def total_db_hits(self):
+        """The db hits of the whole plan, if profiled"""
+        hits = [plan.db_hits for plan in self.walk()
+                if plan.db_hits is not None]
+        return sum(hits) if hits else None
+
+    def warnings(self):
+        """Return a list of warnings about the operators of the plan which
+        usually mean a slow query, such as AllNodesScan and CartesianProduct
+        """
+        warnings = []
+        for plan in self.walk():
+            reason = FLAGGED_OPERATORS.get(plan.operator)
+            if reason is not None:
+                warnings.append('%s of %s %s' % (
+                    plan.operator, ', '.join(plan.identifiers) or 'the query',
+                    reason))
+        return warnings
+
+    def render(self):
+        """Return the plan as an indented tree of operators, one per line,
+        with their counters
+        """
+        lines = []
+        self._render(lines, 0)
+        return '\n'.join(lines)
+
+    __str__ = render
+
+    def _render(self, lines, depth):
+        text = '  ' * depth + '+' + self.operator
+        if self.identifiers:
+            text += ' (%s)' % ', '.join(self.identifiers)
+        counters = []
+        for attr, label in (('estimated_rows', 'estimated rows'),
+                            ('rows', 'rows'),
+                            ('db_hits', 'db hits'),
+                            ('page_cache_hits', 'page cache hits'),
+                            ('page_cache_misses', 'page cache misses')):
+            value = getattr(self, attr)
+            if value is not None:
+                counters.append('%s %s' % (label, _format_count(value)))
+        if counters:
+            text += ' ' + ', '.join(counters)
+        if self.operator in FLAGGED_OPERATORS:
+            text += ' [!]'
+        lines.append(text)
+        for child in self.children:
+            child._render(lines, depth + 1)
+
+
+def _format_count(value):
+    if isinstance(value, float):
+        return '%g' % value
+    return str(value)
@@ -0,0 +1,176 @@
+"""Connection pooling for Engines"""
+
+import logging
+import time
+
+from . import exc, util
+from .util.compat import queue
+
+
+class _ConnectionRecord(object):
+    """Keeps a pooled connection along with when it was made"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.connection = None
+        self.starttime = None
+        self._connect()
+
+    def _connect(self):
+        self.connection = self.pool._creator()
+        self.starttime = time.time()
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                self.pool.logger.debug('Error closing connection',
+                                       exc_info=True)
+            self.connection = None
+
+    def reconnect(self):
+        self.close()
+        self._connect()
+
+    def get_connection(self):
+        """Return the connection, replacing it first if it's outlived the
+        pool's recycle time
+        """
+        recycle = self.pool._recycle
+        if self.connection is None or (
+                recycle > -1 and time.time() - self.starttime > recycle):
+            self.reconnect()
+        return self.connection
+
+
+class QueuePool(object):
+    """A thread-safe pool of connections, handed out first in, first out.
+
+    :param creator: A function returning a new connection.
+    :param pool_size: The number of connections to keep open in the pool.
+    :param max_overflow: The number of connections which may be opened beyond
+      pool_size when the pool is exhausted. These are closed when checked in
+      to a full pool.
+    :param timeout: Seconds to wait for a connection when the pool is
+      exhausted, before raising TimeoutError.
+    :param recycle: Seconds after which a connection is replaced on checkout.
+      -1 disables recycling.
+    """
+
+    logger = logging.getLogger(__name__ + '.QueuePool')
+
+    def __init__(self, creator, pool_size=5, max_overflow=10, timeout=30,
+                 recycle=-1):
+        self._creator = creator
+        self._pool = queue.Queue(pool_size)
+        self._pool_size = pool_size
+        self._max_overflow = max_overflow
+        self._timeout = timeout
+        self._recycle = recycle
+        #: Connections opened beyond the pool's size. Starts negative, as the
+        #: pool itself is filled lazily.
+        self._overflow = 0 - pool_size
+        self._overflow_lock = util.threading.Lock()
+        self._stats_lock = util.threading.Lock()
+
+        #: Number of checkouts made from the pool
+        self.checkouts = 0
+        #: Total seconds spent waiting for connections on checkout
+        self.checkout_wait_total = 0.0
+        #: Longest time, in seconds, spent waiting on a single checkout
+        self.checkout_wait_max = 0.0
+
+    @property
+    def checkout_wait_mean(self):
+        """Mean seconds spent waiting for a connection on checkout"""
+        if not self.checkouts:
+            return 0.0
+        return self.checkout_wait_total / self.checkouts
+
+    def checkout(self):
+        """Return a _ConnectionRecord, blocking for up to timeout seconds if
+        the pool is exhausted
+        """
+        start = time.time()
+        record = self._do_get()
+        waited = time.time() - start
+
+        with self._stats_lock:
+            self.checkouts += 1
+            self.checkout_wait_total += waited
+            if waited > self.checkout_wait_max:
+                self.checkout_wait_max = waited
+        return record
+
+    def checkin(self, record):
+        """Return a record to the pool, closing it if the pool is full"""
+        try:
+            self._pool.put(record, False)
+        except queue.Full:
+            record.close()
+            with self._overflow_lock:
+                self._overflow -= 1
+
+    def discard(self, record):
+        """Close a checked out record which is unfit to be reused"""
+        record.close()
+        self.checkin(record)
+
+    def _do_get(self):
+        use_overflow = self._max_overflow > -1
+        try:
+            wait = use_overflow and self._overflow >= self._max_overflow
+            return self._pool.get(wait, self._timeout)
+        except queue.Empty:
+            pass
+
+        if use_overflow and self._overflow >= self._max_overflow:
+            if not wait:
+                return self._do_get()
+            raise exc.TimeoutError(
+                'QueuePool limit of size %d overflow %d reached, connection '
+                'timed out, timeout %d' % (
+                    self._pool_size, self._max_overflow, self._timeout))
+
+        with self._overflow_lock:
+            if use_overflow and self._overflow >= self._max_overflow:
+                return self._do_get()
+            self._overflow += 1
+        try:
+            return _ConnectionRecord(self)
+        except:
+            with self._overflow_lock:
+                self._overflow -= 1
+            raise
+
+    def dispose(self):
+        """Close all connections idle in the pool"""
+        while True:
+            try:
+                record = self._pool.get(False)
+            except queue.Empty:
+                break
+            record.close()
+            with self._overflow_lock:
+                self._overflow -= 1
+
+    def size(self):
+        return self._pool_size
+
+    def checkedin(self):
+        return self._pool.qsize()
+
+    def overflow(self):
+        return self._overflow
+
+    def checkedout(self):
+        return self._pool.maxsize - self._pool.qsize() + self._overflow
+
+    def status(self):
+        return ('Pool size: %d  Connections in pool: %d Current overflow: %d '
+                'Current checked out connections: %d Mean checkout wait: '
+                '%.4fs Max checkout wait: %.4fs' % (
+                    self.size(), self.checkedin(), self.overflow(),
+                    self.checkedout(), self.checkout_wait_mean,
+                    self.checkout_wait_max))
@@ -0,0 +1,216 @@
+"""Indexes and constraints declared by the props of Node classes, and their
+creation on the server
+"""
+
+import collections
+import logging
+import re
+import sys
+
+from . import exc, ogm, util
+from .cypher import compiler
+
+
+logger = logging.getLogger(__name__)
+
+#: An index of the property name of the nodes labeled label
+Index = collections.namedtuple('Index', ['label', 'name'])
+
+#: A constraint that no two nodes labeled label share a value of the property
+#: name
+UniqueConstraint = collections.namedtuple('UniqueConstraint',
+                                          ['label', 'name'])
+
+_index_re = re.compile(r'INDEX ON :`?([^`(]+)`?\(`?([^`),]+)`?\)')
+_constraint_re = re.compile(
+    r'CONSTRAINT ON \( *\w+:`?([^`) ]+)`? *\) ASSERT \(?\w+\.`?([^`) ]+)`?\)?'
+    r' IS UNIQUE')
+
+
+class MetaData(object):
+    """The indexes and constraints declared by a collection of Node classes.
+
+    Props declared with ``index=True`` are indexed, and those declared with
+    ``unique=True`` or ``primary_key=True`` are given a uniqueness
+    constraint, which the server enforces with an index of its own.
+
+    :param node_types: The Node classes to manage. If none are given, every
+      Node class declared is, including those declared later.
+    """
+
+    def __init__(self, *node_types):
+        self._node_types = node_types
+
+    @property
+    def node_types(self):
+        """The Node classes managed"""
+        if self._node_types:
+            return list(self._node_types)
+        return [node_type
+                for name, node_type in sorted(ogm._node_registry.items())
+                if issubclass(node_type, ogm.Node)]
+
+    def declared(self, node_types=None):
+        """Return ordered sets of the Indexes and UniqueConstraints declared
+        by node_types, by default all those managed
+        """
+        indexes = util.OrderedSet()
+        constraints = util.OrderedSet()
+        if node_types is None:
+            node_types = self.node_types
+        for node_type in node_types:
+            label = node_type.__label__
+            info = ogm._instance_info(node_type)
+            for key, prop in sorted(info.properties.items()):
+                if prop.unique:
+                    constraints.add(UniqueConstraint(label, prop.name))
+                elif prop.index:
+                    indexes.add(Index(label, prop.name))
+        return indexes, constraints
+
+    def create_all(self, engine=None, dry_run=False, file=None,
+                   replace_indexes=False):
+        """Create the declared indexes and constraints missing from the
+        server, leaving those already there alone.
+
+        The server's indexes and constraints are read first, so only the
+        missing ones are created, each by its own statement.
+
+        :param engine: The Engine to create them with. If None, each Node
+          class's own engine is used, else the default engine.
+        :param dry_run: If True, nothing is created; the DDL is written to
+          file, by default stdout, instead.
+        :param replace_indexes: Whether to drop an index in the way of a
+          declared constraint, so the constraint's own index replaces it. If
+          the constraint then fails, as it does when nodes share a value,
+          the index is created again. Otherwise, such constraints are left
+          out, with a warning, or a comment in the dry run's DDL.
+
+        Returns a list of the DDL statements, as strings.
+        """
+        by_engine = util.OrderedDict()
+        for node_type in self.node_types:
+            node_engine = engine or node_type._impl.get_engine()
+            by_engine.setdefault(node_engine, []).append(node_type)
+
+        out = file or sys.stdout
+        ddl = []
+        for node_engine, node_types in by_engine.items():
+            statements, blocked = self._missing(node_engine, node_types,
+                                                replace_indexes)
+            for constraint in blocked:
+                message = ('Not created, as an index is in the way; pass '
+                           'replace_indexes=True to replace it: %s' %
+                           _compile(compiler.CreateUniqueConstraint(
+                               *constraint)))
+                if dry_run:
+                    out.write('// %s\n' % message)
+                else:
+                    logger.warning(message)
+
+            dropped = None
+            for stmt in statements:
+                text = _compile(stmt)
+                ddl.append(text)
+                if dry_run:
+                    out.write(text + ';\n')
+                    continue
+                logger.info(text)
+                try:
+                    ogm._execute_statement(node_engine, stmt).fetchall()
+                except exc.DatabaseError:
+                    if dropped is not None:
+                        # Don't leave the property without an index
+                        logger.info(_compile(dropped))
+                        ogm._execute_statement(node_engine,
+                                               dropped).fetchall()
+                    raise
+                if isinstance(stmt, compiler.DropIndex):
+                    dropped = compiler.CreateIndex(stmt.label, stmt.name)
+                else:
+                    dropped = None
+        return ddl
+
+    def _missing(self, engine, node_types, replace_indexes=False):
+        """Return the DDL elements creating the indexes and constraints of
+        node_types missing from engine's server, and the constraints left
+        out as an index is in their way.
+
+        :param replace_indexes: Whether to drop such indexes, right before
+          creating their constraints, rather than leave the constraints out.
+        """
+        indexes, constraints = self.declared(node_types)
+        server_indexes, server_constraints = reflect(engine)
+
+        statements = []
+        blocked = []
+        for constraint in constraints:
+            if constraint in server_constraints:
+                continue
+            if Index(*constraint) in server_indexes:
+                if not replace_indexes:
+                    blocked.append(constraint)
+                    continue
+                statements.append(compiler.DropIndex(*constraint))
+            statements.append(compiler.CreateUniqueConstraint(*constraint))
+        for index in indexes:
+            if index not in server_indexes:
+                statements.append(compiler.CreateIndex(*index))
+        return statements, blocked
+
+
+#: Manages every Node class
+metadata = MetaData()
+
+
+def sync_schema(engine=None, dry_run=False, file=None, replace_indexes=False):
+    """Create the indexes and constraints of every Node class missing from
+    the server; see :meth:`MetaData.create_all`
+    """
+    return metadata.create_all(engine, dry_run=dry_run, file=file,
+                               replace_indexes=replace_indexes)
+
+
+def _compile(stmt):
+    return compiler.CypherCompiler(stmt).compile()
+
+
+def reflect(engine):
+    """Return sets of the single-property Indexes and UniqueConstraints of
+    nodes on engine's server. The indexes backing constraints are included.
+    """
+    indexes = set()
+    for record in _call(engine, 'db.indexes'):
+        index = _reflect_index(record)
+        if index is not None:
+            indexes.add(index)
+
+    constraints = set()
+    for record in _call(engine, 'db.constraints'):
+        match = _constraint_re.search(record.get('description') or '')
+        if match is not None:
+            constraints.add(UniqueConstraint(*match.groups()))
+    return indexes, constraints
+
+
+def _reflect_index(record):
+    labels = record.get('labelsOrTypes', record.get('tokenNames'))
+    if record.get('entityType', 'NODE') != 'NODE':
+        return None
+    if labels is not None and record.get('properties') is not None:
+        if len(labels) == 1 and len(record['properties']) == 1:
+            return Index(labels[0], record['properties'][0])
+        return None
+
+    match = _index_re.search(record.get('description') or '')
+    if match is not None:
+        return Index(*match.groups())
+    return None
+
+
+def _call(engine, procedure):
+    """Call procedure, returning its records as dicts keyed by column"""
+    stmt = compiler.Call(compiler.FunctionCall(procedure))
+    result = ogm._execute_statement(engine, stmt)
+    rows = result.fetchall()
+    return [dict(zip(result.columns, row)) for row in rows]
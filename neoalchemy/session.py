@@ -0,0 +1,445 @@
+"""Sessions, which keep track of the Node instances of a unit of work"""
+
+import weakref
+
+from . import exc, ogm, util
+from .cypher import compiler
+
+
+def _update_statement(rows):
+    """Return a statement merging the props of each of rows, dicts of a node
+    id and its dehydrated properties, into the node with that id
+    """
+    row = compiler.Variable(None, 'row')
+    node = compiler.Variable(None, 'n')
+    return compiler.Statement(
+        compiler.Unwind(compiler.BindParameter('rows', rows), row),
+        compiler.Match(compiler.Node(variable=node)),
+        compiler.Where(compiler.BinaryExpression(
+            compiler.FunctionCall('id', node), '=',
+            compiler.PropertyAccess(row, 'id'))),
+        compiler.SetProperties(node, compiler.PropertyAccess(row, 'props'),
+                               update=True))
+
+
+class BatchLoader(object):
+    """Loads the nodes of a Node class into a session by primary key,
+    batching the lookups. Nodes are keyed by their primary key prop, else by
+    node id.
+
+    Keys registered with :meth:`add` are pending. Looking up a key not loaded
+    yet loads it along with every pending key in a single query, so lookups
+    scattered across a unit of work cost one round trip. Keys of instances
+    already in the session aren't looked up, and keys of nodes which don't
+    exist map to None until the session's next flush.
+
+    As in the session's identity map, instances are held weakly once they've
+    been looked up; those loaded along with another key are held until their
+    own lookup.
+    """
+
+    #: The most keys looked up by a single query
+    chunk_size = 1000
+
+    def __init__(self, session, node_type):
+        self.session = session
+        self.node_type = node_type
+        #: Keys to load along with the next lookup of a key not loaded yet
+        self.pending = util.OrderedSet()
+        # Instances loaded but not looked up yet, by key
+        self._loaded = {}
+        # Instances looked up, by key
+        self._found = weakref.WeakValueDictionary()
+        # Keys of nodes which don't exist
+        self._missing = set()
+
+    def __contains__(self, key):
+        return (key in self._loaded or key in self._missing or
+                self._found.get(key) is not None)
+
+    def __getitem__(self, key):
+        if key not in self:
+            self.pending.add(key)
+            self._load_pending(self.chunk_size)
+        return self._claim(key)
+
+    def add(self, *keys):
+        """Register keys to be loaded by the next lookup"""
+        for key in keys:
+            if key not in self:
+                self.pending.add(key)
+
+    def load_many(self, keys, chunk_size=None):
+        """Return a list of the instances of keys, in their order, loading
+        those not loaded yet along with the pending keys
+        """
+        self.add(*keys)
+        self._load_pending(chunk_size or self.chunk_size)
+        return [self._claim(key) for key in keys]
+
+    def discard(self, key, instance):
+        """Forget instance, if it's the one loaded for key"""
+        for instances in (self._loaded, self._found):
+            if instances.get(key) is instance:
+                del instances[key]
+
+    def expire_missing(self):
+        """Forget the keys of nodes found not to exist, so they're looked up
+        again
+        """
+        self._missing.clear()
+
+    def _claim(self, key):
+        instance = self._loaded.pop(key, None)
+        if instance is not None:
+            self._found[key] = instance
+            return instance
+        return self._found.get(key)
+
+    def _load_pending(self, chunk_size):
+        keys = [key for key in self.pending if key not in self]
+        self.pending.clear()
+        if not keys:
+            return
+
+        found = self.session._instances_by_key(self.node_type, keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            found.update(ogm._fetch_by_key(
+                self.session.query(self.node_type), missing, chunk_size))
+        for key in keys:
+            instance = found.get(key)
+            if instance is None:
+                self._missing.add(key)
+            else:
+                self._loaded[key] = instance
+
+
+class Session(object):
+    """Keeps track of the Node instances loaded and added in a unit of work.
+
+    Queries made through :meth:`query` load their results into an identity
+    map, keyed by node id, so each node is represented by a single instance.
+    A row for a node already in the map returns the existing instance,
+    without inflating the row again. Instances are held weakly, and leave the
+    map once no longer referenced elsewhere, except those with properties set
+    since the last flush, which are held until it.
+
+    Instances passed to :meth:`add` are pending until :meth:`flush`. New
+    instances are created with one statement per Node class. Persistent
+    instances, whether added or loaded, have the properties changed since
+    they were loaded written back, with one statement per engine; those with
+    no changes are skipped.
+
+    Reading a Rel of an instance of the session loads it for every instance
+    of the session which hasn't loaded it yet, in a single query, and
+    :meth:`get` batches lookups by node id through a :class:`BatchLoader`.
+    Session queries load their results in batches, as with
+    :meth:`~neoalchemy.ogm.Query.yield_per`, so a Rel read while iterating
+    over one is loaded once per batch.
+    """
+
+    def __init__(self, engine=None):
+        #: The Engine statements are run with. If None, each Node class's own
+        #: engine is used, else the default engine.
+        self.engine = engine
+        #: Maps node ids to the persistent instances of the session
+        self.identity_map = weakref.WeakValueDictionary()
+        self._new = util.OrderedIdentitySet()
+        self._dirty = util.OrderedIdentitySet()
+        self._batch_loaders = {}
+        # Maps Node classes with a primary key prop to weak dicts of the
+        # instances of the identity map by primary key
+        self._by_key = {}
+
+    @property
+    def new(self):
+        """Instances pending creation"""
+        return list(self._new)
+
+    @property
+    def dirty(self):
+        """Persistent instances with changes pending an update"""
+        return [instance for instance in self._persistent()
+                if ogm._instance_changes(instance)]
+
+    def __contains__(self, instance):
+        if instance in self._new:
+            return True
+        node_id = ogm._instance_id(instance)
+        return (node_id is not None and
+                self.identity_map.get(node_id) is instance)
+
+    def query(self, *entities):
+        """Return a Query for entities, loading results into this session"""
+        return ogm.Query(*entities).with_session(self)
+
+    def get(self, node_type, key):
+        """Return the instance of node_type whose primary key is key, or None
+        if there's no such node.
+
+        Nodes not in the session are loaded through the batch loader of
+        node_type, along with the keys pending there. The lookup is made
+        right away, so that the instance itself, or None, can be returned;
+        register the keys a unit of work needs with the batch loader first,
+        and the first lookup loads them all.
+        """
+        return self.batch_loader(node_type)[key]
+
+    def get_many(self, node_type, keys, chunk_size=None):
+        """Return a list of the instances of node_type whose primary keys are
+        keys, in their order, with None for those not found. Only the keys
+        of nodes not in the session are looked up, chunk_size at a time.
+        """
+        return self.batch_loader(node_type).load_many(keys, chunk_size)
+
+    def batch_loader(self, node_type):
+        """Return the session's BatchLoader of node_type"""
+        loader = self._batch_loaders.get(node_type)
+        if loader is None:
+            loader = self._batch_loaders[node_type] = BatchLoader(self,
+                                                                  node_type)
+        return loader
+
+    def get_engine(self, node_type):
+        """Return the Engine statements for node_type are run with"""
+        if self.engine is not None:
+            return self.engine
+        return node_type._impl.get_engine()
+
+    def add(self, instance):
+        """Place instance in the session, to be created or updated on the next
+        flush
+        """
+        node_id = ogm._instance_id(instance)
+        if node_id is None:
+            self._new.add(instance)
+            self._attach(instance)
+            return
+
+        existing = self.identity_map.get(node_id)
+        if existing is not None and existing is not instance:
+            raise exc.InvalidRequestError(
+                'Another instance of node %d is already present in this '
+                'session' % node_id)
+        self.identity_map[node_id] = instance
+        self._index(instance)
+        self._dirty.add(instance)
+        self._attach(instance)
+
+    def add_all(self, instances):
+        for instance in instances:
+            self.add(instance)
+
+    def expunge(self, instance):
+        """Remove instance from the session, discarding any pending changes"""
+        self._new.discard(instance)
+        self._dirty.discard(instance)
+        node_id = ogm._instance_id(instance)
+        if node_id is not None and self.identity_map.get(node_id) is instance:
+            del self.identity_map[node_id]
+        for node_type, by_key in self._by_key.items():
+            if isinstance(instance, node_type):
+                key = node_type._impl.primary_key(instance)
+                if by_key.get(key) is instance:
+                    del by_key[key]
+        for node_type, loader in self._batch_loaders.items():
+            if isinstance(instance, node_type):
+                loader.discard(node_type._impl.primary_key(instance),
+                               instance)
+        self._detach(instance)
+
+    def expunge_all(self):
+        """Remove all instances from the session"""
+        for instance in list(self.identity_map.values()) + list(self._new):
+            self._detach(instance)
+        self.identity_map.clear()
+        self._new.clear()
+        self._dirty.clear()
+        self._batch_loaders.clear()
+        self._by_key.clear()
+
+    close = expunge_all
+
+    def flush(self):
+        """Create pending new instances and write back changed properties"""
+        if self._new:
+            self._flush_new()
+        self._flush_dirty()
+        # Nodes found missing may have been created since
+        for loader in self._batch_loaders.values():
+            loader.expire_missing()
+
+    def _persistent(self):
+        """Return the added instances and those of the identity map whose
+        properties have been set, which may have changes to write back
+        """
+        return list(self._dirty)
+
+    def _flush_new(self):
+        by_type = util.OrderedDict()
+        for instance in self._new:
+            by_type.setdefault(instance.__class__, []).append(instance)
+
+        for node_type, instances in by_type.items():
+            impl = node_type._impl
+            rows = [impl.dehydrate(ogm._instance_state(instance))
+                    for instance in instances]
+            engine = self.get_engine(node_type)
+            result = ogm._execute_statement(engine,
+                                            impl.create_statement(rows))
+            node_ids = [row[0] for row in result]
+
+            # Nodes are created, and their ids returned, in the order of rows
+            for instance, node_id in zip(instances, node_ids):
+                setattr(instance, ogm.NA_ID_INSTANCE_VAR, node_id)
+                instance.__dict__[ogm.NA_ENGINE_INSTANCE_VAR] = engine
+                ogm._commit_instance(instance)
+                self.identity_map[node_id] = instance
+                self._index(instance)
+                self._new.discard(instance)
+
+    def _flush_dirty(self):
+        by_engine = util.OrderedDict()
+        for instance in self._persistent():
+            changes = ogm._instance_changes(instance)
+            if not changes:
+                # Set to their loaded values; start tracking afresh
+                ogm._commit_instance(instance)
+                continue
+            node_type = instance.__class__
+            row = {
+                'id': ogm._instance_id(instance),
+                'props': node_type._impl.dehydrate(changes),
+            }
+            by_engine.setdefault(self.get_engine(node_type), []).append(
+                (instance, row))
+
+        for engine, updates in by_engine.items():
+            stmt = _update_statement([row for instance, row in updates])
+            ogm._execute_statement(engine, stmt).fetchall()
+            for instance, row in updates:
+                ogm._commit_instance(instance)
+        self._dirty.clear()
+
+    def _instances_by_key(self, node_type, keys):
+        """Return a dict of the instances of node_type in the identity map
+        whose primary keys are among keys
+        """
+        impl = node_type._impl
+        if ogm._instance_info(node_type).primary_key is None:
+            instances = self.identity_map
+        else:
+            instances = self._by_key.get(node_type, {})
+        found = {}
+        for key in keys:
+            instance = instances.get(key)
+            # The primary key prop may have been set since it was indexed
+            if isinstance(instance, node_type) and \
+                    impl.primary_key(instance) == key:
+                found[key] = instance
+        return found
+
+    def _key_indexes(self, node_type):
+        """Return the dicts of instances by primary key which instances of
+        node_type are indexed in: those of node_type and of its Node base
+        classes which have a primary key prop
+        """
+        indexes = []
+        for cls in node_type.__mro__:
+            if ogm.NA_NODE_INFO_INSTANCE_VAR not in cls.__dict__ or \
+                    ogm._instance_info(cls).primary_key is None:
+                continue
+            by_key = self._by_key.get(cls)
+            if by_key is None:
+                by_key = self._by_key[cls] = weakref.WeakValueDictionary()
+            indexes.append(by_key)
+        return indexes
+
+    def _index(self, instance):
+        """Index instance by its primary key, if its class has one"""
+        indexes = self._key_indexes(instance.__class__)
+        if indexes:
+            key = instance.__class__._impl.primary_key(instance)
+            if key is not None:
+                for by_key in indexes:
+                    by_key[key] = instance
+
+    def _attach(self, instance):
+        instance.__dict__[ogm.NA_SESSION_INSTANCE_VAR] = weakref.ref(self)
+
+    def _detach(self, instance):
+        if ogm._instance_session(instance) is self:
+            del instance.__dict__[ogm.NA_SESSION_INSTANCE_VAR]
+
+    def _load_related(self, rel, instance, engine=None):
+        """Load the instances related through rel to instance, and to every
+        other instance of the session which hasn't loaded rel yet and was
+        loaded with the same engine, in a single query.
+
+        :param engine: The Engine instance was loaded with, if known.
+        """
+        parents = util.OrderedIdentitySet([instance])
+        for other in list(self.identity_map.values()):
+            if isinstance(other, rel.parent) and \
+                    rel.key not in ogm._related(other) and \
+                    other.__dict__.get(ogm.NA_ENGINE_INSTANCE_VAR) is engine:
+                parents.add(other)
+        node_ids = [ogm._instance_id(parent) for parent in parents]
+
+        query = self.query(rel.parent)
+        if engine is not None:
+            query = query.with_engine(engine)
+        # The eager option stores the related instances on the parents
+        query.filter(
+            ogm._id_criterion(rel.parent, 'IN', node_ids)).options(
+            ogm.eager(rel)).all()
+        # Parents which are gone from the server have nothing related
+        for parent in parents:
+            ogm._related(parent).setdefault(rel.key, [])
+
+    def _loader(self, node_type, partial=False):
+        """Return a function loading rows of node_type into the session.
+
+        It inflates a row only if the node isn't already in the identity map;
+        otherwise, the instance in the map is returned. If that instance was
+        loaded with only some of its properties, it's given those of the row
+        it lacks.
+
+        :param partial: Whether rows hold only some of the nodes' properties.
+        """
+        inflate = node_type._impl.inflate
+        identity_map = self.identity_map
+        attach = self._attach
+        index = self._index if self._key_indexes(node_type) else None
+
+        def load(node_id, props):
+            instance = identity_map.get(node_id)
+            if instance is None:
+                instance = identity_map[node_id] = inflate(node_id, props)
+                attach(instance)
+                if index is not None:
+                    index(instance)
+                if partial:
+                    instance.__dict__[ogm.NA_PARTIAL_INSTANCE_VAR] = True
+            elif not isinstance(instance, node_type):
+                # Loaded as an unrelated class; keep the first in the map
+                instance = inflate(node_id, props)
+            elif ogm.NA_PARTIAL_INSTANCE_VAR in instance.__dict__:
+                _complete(instance, inflate(node_id, props), partial)
+                if index is not None:
+                    index(instance)
+            return instance
+        return load
+
+
+def _complete(instance, loaded, partial):
+    """Give a partially loaded instance the properties of loaded, an instance
+    of the same node, which it lacks. Properties set since it was loaded are
+    kept.
+    """
+    state = ogm._instance_state(instance)
+    for name, value in ogm._instance_state(loaded).items():
+        state.setdefault(name, value)
+    if not partial:
+        del instance.__dict__[ogm.NA_PARTIAL_INSTANCE_VAR]
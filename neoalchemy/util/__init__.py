@@ -1,4 +1,5 @@
-from .compat import string_types, py2k, py3k, py32, callable
+from .compat import string_types, text_type, int_types, py2k, py3k, py32, \
+    callable, threading, with_metaclass
 
 from ._collections import KeyedTuple, ImmutableContainer, immutabledict, \
     Properties, OrderedProperties, ImmutableProperties, OrderedDict, \
@@ -13,10 +13,15 @@ py2k = sys.version_info <= (3, 0)
 
 if py3k:
     string_types = str,
+    text_type = str
+    int_types = int,
 
     import itertools
     itertools_filterfalse = itertools.filterfalse
 
+    import queue
+    from urllib.parse import urlparse, unquote
+
     if py32:
         callable = callable
     else:
@@ -24,8 +29,33 @@ if py3k:
             return hasattr(fn, '__call__')
 else:
     string_types = basestring,
+    text_type = unicode
+    int_types = int, long
 
     import itertools
     itertools_filterfalse = itertools.ifilterfalse
 
+    import Queue as queue
+    from urlparse import urlparse, unquote
+
     callable = callable
+
+
+def with_metaclass(meta, *bases):
+    """Create a base class with a metaclass.
+
+    Drops the middle class upon creation.
+
+    Source: http://lucumr.pocoo.org/2013/5/21/porting-to-python-3-redux/
+
+    """
+
+    class metaclass(meta):
+        __call__ = type.__call__
+        __init__ = type.__init__
+
+        def __new__(cls, name, this_bases, d):
+            if this_bases is None:
+                return type.__new__(cls, name, (), d)
+            return meta(name, bases, d)
+    return metaclass('temporary_class', None, {})
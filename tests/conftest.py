@@ -0,0 +1,33 @@
+import sys
+
+import pytest
+
+from neoalchemy import ogm
+
+from .fakeserver import FakeServer
+from .stubs import StubEngine
+
+
+@pytest.fixture
+def engine(request):
+    """A StubEngine installed as the default engine for the test"""
+    stub = StubEngine()
+    previous = ogm._default_engine
+    ogm.set_default_engine(stub)
+
+    def restore():
+        ogm._default_engine = previous
+    request.addfinalizer(restore)
+    return stub
+
+
+@pytest.fixture
+def server(request):
+    """A FakeServer, stopped once the test is over"""
+    fake = FakeServer()
+    request.addfinalizer(fake.stop)
+    return fake
+
+
+if sys.version_info < (3, 6):
+    collect_ignore = ['test_asyncio.py']
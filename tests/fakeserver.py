@@ -0,0 +1,134 @@
+"""A stand-in for a Neo4j server's transactional HTTP endpoint, serving
+rows given by the test over real sockets
+"""
+
+import collections
+import json
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+class Drop(Exception):
+    """Raised by a handler to close the connection without answering"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        fake = self.server.fake
+        length = int(self.headers['Content-Length'])
+        body = json.loads(self.rfile.read(length).decode('utf-8'))
+        statement = body['statements'][0]
+        with fake.lock:
+            fake.requests.append((self.path, statement['statement'],
+                                  statement['parameters']))
+            fake.connections.add(self.client_address)
+
+        try:
+            result = fake.respond(statement['statement'],
+                                  statement['parameters'])
+        except Drop:
+            self.close_connection = True
+            return
+
+        out = json.dumps(result).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        # Small chunks, so rows straddle them
+        for start in range(0, len(out), fake.chunk_size):
+            chunk = out[start:start + fake.chunk_size]
+            self.wfile.write(('%x\r\n' % len(chunk)).encode('ascii') +
+                             chunk + b'\r\n')
+        self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+        if fake.drop_idle:
+            # Close without telling the client, as a server timing out an
+            # idle keep-alive connection does
+            self.close_connection = True
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients giving up on a response, as they do on timeouts, are
+        # expected
+        pass
+
+
+class FakeServer(object):
+    """Answers each statement POSTed to it with the rows returned by
+    handler(statement, params), in a single column named ``n``, or with the
+    result dict it returns, which may hold ``columns``, ``rows``, ``stats``
+    and ``plan``, or else ``errors``.
+
+    :param drop_idle: If True, each connection is closed once a response
+      has been sent, without the client being told it will be.
+    :param delay: Seconds to wait before answering each statement.
+    """
+
+    #: Bytes of the response sent per HTTP chunk
+    chunk_size = 7
+
+    def __init__(self, handler=None, drop_idle=False, delay=0):
+        self.handler = handler
+        self.drop_idle = drop_idle
+        self.delay = delay
+        self.lock = threading.Lock()
+        #: (path, statement, params) tuples, in the order they were received
+        self.requests = []
+        #: Client addresses of the connections requests came over
+        self.connections = set()
+
+        self._server = _Server(('127.0.0.1', 0), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        kwargs={'poll_interval': 0.05})
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d/db/data/' % self._server.server_address[1]
+
+    @property
+    def statements(self):
+        return [statement for path, statement, params in self.requests]
+
+    def respond(self, statement, params):
+        if self.delay:
+            time.sleep(self.delay)
+        result = self.handler(statement, params) if self.handler else None
+        if not isinstance(result, dict):
+            result = {'columns': ['n'], 'rows': result or ()}
+        if 'errors' in result:
+            return {'results': [], 'errors': result['errors']}
+
+        # Columns come first, as they do from the server
+        document = collections.OrderedDict([
+            ('columns', result.get('columns') or []),
+            ('data', [{'row': row, 'meta': []} for row in result['rows']]),
+            ('stats', result.get('stats') or {}),
+        ])
+        if 'plan' in result:
+            document['plan'] = result['plan']
+        return {'results': [document], 'errors': []}
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
@@ -0,0 +1,52 @@
+"""An Engine stand-in which records the statements run through it"""
+
+
+class StubResult(object):
+    """A ResultProxy stand-in holding rows given up front"""
+
+    def __init__(self, rows=(), columns=None, stats=None, result=None):
+        self.rows = [list(row) for row in rows]
+        self.columns = columns
+        self.stats = stats or {}
+        self.result = result if result is not None else {}
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def fetchall(self):
+        return list(self)
+
+    def close(self):
+        self.closed = True
+
+
+class StubEngine(object):
+    """Records the statements and params it's given, answering each with
+    the StubResult, or list of rows, returned by handler(statement, params)
+    """
+
+    def __init__(self, handler=None):
+        self.handler = handler
+        #: (statement, params) pairs, in the order they were run
+        self.executed = []
+
+    @property
+    def statements(self):
+        return [statement for statement, params in self.executed]
+
+    @property
+    def last_statement(self):
+        return self.executed[-1][0]
+
+    @property
+    def last_params(self):
+        return self.executed[-1][1]
+
+    def execute(self, statement, params=None):
+        params = params or {}
+        self.executed.append((statement, params))
+        result = self.handler(statement, params) if self.handler else None
+        if not isinstance(result, StubResult):
+            result = StubResult(result or ())
+        return result
@@ -0,0 +1,182 @@
+import asyncio
+
+import pytest
+
+from neoalchemy import exc, ogm
+from neoalchemy.asyncio import AsyncQuery, create_async_engine
+from neoalchemy.types import String
+
+from .fakeserver import Drop
+
+
+class AsyncMonkey(ogm.Node):
+    name = ogm.Prop(String)
+    friends = ogm.Rel('FRIEND', 'AsyncMonkey')
+
+
+def _monkeys(count):
+    return {'columns': ['id(n)', 'properties(n)'],
+            'rows': [[i, {'name': 'm%d' % i}] for i in range(count)]}
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+async def _fetchall(engine, statement):
+    result = await engine.execute(statement)
+    return await result.fetchall()
+
+
+def test_connection_dropped_while_idle_is_replaced(server):
+    server.drop_idle = True
+    engine = create_async_engine(server.url, pool_size=1)
+
+    async def run():
+        for i in range(3):
+            await _fetchall(engine, 'RETURN 1')
+            await asyncio.sleep(0.05)
+    _run(run())
+
+    assert len(server.requests) == 3
+    assert len(server.connections) == 3
+
+
+def test_request_is_not_resent_once_sent(server):
+    def handler(statement, params):
+        if statement == 'CREATE (n)':
+            raise Drop()
+        return []
+    server.handler = handler
+    engine = create_async_engine(server.url, pool_size=1)
+
+    async def run():
+        await _fetchall(engine, 'RETURN 1')
+        with pytest.raises(ConnectionError):
+            await engine.execute('CREATE (n)')
+    _run(run())
+
+    assert server.statements == ['RETURN 1', 'CREATE (n)']
+
+
+def test_concurrent_queries_share_small_pool(server):
+    server.handler = lambda statement, params: _monkeys(5)
+    server.delay = 0.02
+    engine = create_async_engine(server.url, pool_size=2)
+    query = AsyncQuery(AsyncMonkey).with_engine(engine)
+
+    async def run():
+        return await asyncio.gather(*[query.all() for i in range(10)])
+    results = _run(run())
+
+    assert [len(monkeys) for monkeys in results] == [5] * 10
+    assert results[0][4].name == 'm4'
+    assert len(server.requests) == 10
+    assert len(server.connections) <= 2
+    assert engine.pool.checkouts == 10
+
+
+def test_cancelled_query_releases_connection(server):
+    server.handler = lambda statement, params: _monkeys(1)
+    engine = create_async_engine(server.url, pool_size=1, pool_timeout=1)
+    query = AsyncQuery(AsyncMonkey).with_engine(engine)
+
+    async def run():
+        server.delay = 0.3
+        task = asyncio.ensure_future(query.all())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        server.delay = 0
+        return await query.all()
+
+    assert len(_run(run())) == 1
+
+
+def test_early_break_releases_connection(server):
+    server.handler = lambda statement, params: _monkeys(500)
+    engine = create_async_engine(server.url, pool_size=1, pool_timeout=1)
+    query = AsyncQuery(AsyncMonkey).with_engine(engine)
+
+    async def run():
+        results = query.__aiter__()
+        async for monkey in results:
+            break
+        await results.aclose()
+        return await query.all()
+
+    assert len(_run(run())) == 500
+    assert len(server.requests) == 2
+
+
+def test_update_and_delete_are_awaited(server):
+    def handler(statement, params):
+        if 'DELETE' in statement:
+            return {'rows': [], 'stats': {'nodes_deleted': 3}}
+        if 'SET' in statement:
+            return [[4]]
+        return [[7]]
+    server.handler = handler
+    engine = create_async_engine(server.url)
+    query = AsyncQuery(AsyncMonkey).with_engine(engine)
+
+    async def run():
+        return (await query.update({'name': 'x'}), await query.delete(),
+                await query.count())
+
+    assert _run(run()) == (4, 3, 7)
+
+
+def test_batched_update_is_awaited(server):
+    def handler(statement, params):
+        if 'node_ids' not in params:
+            return [[i] for i in range(5)]
+        return [[len(params['node_ids'])]]
+    server.handler = handler
+    engine = create_async_engine(server.url)
+    query = AsyncQuery(AsyncMonkey).with_engine(engine)
+
+    assert _run(query.update({'name': 'x'}, batch_size=2)) == 5
+    assert [params.get('node_ids') for path, statement, params
+            in server.requests] == [None, [0, 1], [2, 3], [4]]
+
+
+def test_iter_pages_and_values_are_async_iterators(server):
+    def handler(statement, params):
+        if 'properties' not in statement:
+            return [['a'], ['b']]
+        start = params.get('last_key', -1) + 1
+        return {'rows': [[i, {'name': 'm%d' % i}]
+                         for i in range(start, min(start + 2, 5))]}
+    server.handler = handler
+    engine = create_async_engine(server.url)
+    query = AsyncQuery(AsyncMonkey).with_engine(engine)
+
+    async def run():
+        pages = [[monkey.name for monkey in page]
+                 async for page in query.iter_pages(page_size=2)]
+        values = [row.name async for row in query.values(AsyncMonkey.name)]
+        return pages, values
+
+    assert _run(run()) == ([['m0', 'm1'], ['m2', 'm3'], ['m4']], ['a', 'b'])
+
+
+def test_iteration_must_be_async():
+    with pytest.raises(TypeError):
+        iter(AsyncQuery(AsyncMonkey))
+
+
+def test_rels_of_async_results_are_not_loaded_lazily(server):
+    server.handler = lambda statement, params: _monkeys(1)
+    engine = create_async_engine(server.url)
+
+    monkey = _run(AsyncQuery(AsyncMonkey).with_engine(engine).all())[0]
+
+    with pytest.raises(exc.InvalidRequestError):
+        monkey.friends
+    assert len(server.requests) == 1
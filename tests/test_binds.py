@@ -0,0 +1,113 @@
+import gc
+import weakref
+
+import pytest
+
+from neoalchemy import exc
+from neoalchemy.cypher import compiler
+from neoalchemy.types import Integer
+
+
+class ReversedBinary(compiler.BinaryExpression):
+    """Reaches its right side first in its cache key, but compiles its left
+    side first
+    """
+    __visit_name__ = 'binary'
+    _cache_key_attrs = ('right', 'operator', 'left')
+
+
+def _where(left, right):
+    n = compiler.Variable(None, 'n')
+    return compiler.Statement(
+        compiler.Match(compiler.Node(variable=n)),
+        compiler.Where(ReversedBinary(
+            compiler.BindParameter('low', left), '<',
+            compiler.BindParameter('high', right))),
+        compiler.Return(n))
+
+
+def test_parameterized_compile_renders_placeholders():
+    stmt = compiler.Statement(compiler.Match(compiler.Node(
+        label='Monkey', variable=compiler.Variable(None, 'n'),
+        properties=compiler.Properties({'name': 'Bubbles', 'age': 3}))))
+    comp = compiler.CypherCompiler(stmt, parameterized=True)
+
+    assert comp.compile() == 'MATCH (n:Monkey {age: $age, name: $name})'
+    assert comp.params == {'age': 3, 'name': 'Bubbles'}
+
+
+def test_unparameterized_compile_inlines_literals():
+    stmt = compiler.Match(compiler.Node(properties=compiler.Properties(
+        {'a': None, 'b': True, 'c': 'x'})))
+    assert (compiler.CypherCompiler(stmt).compile() ==
+            'MATCH ({a: null, b: true, c: "x"})')
+
+
+def test_unique_bind_names():
+    stmt = compiler.Where(
+        compiler.BinaryExpression(
+            'x', '=', compiler.BindParameter('v', 1, unique=True)),
+        compiler.BinaryExpression(
+            'y', '=', compiler.BindParameter('v', 2, unique=True)))
+    comp = compiler.CypherCompiler(stmt, parameterized=True)
+
+    assert comp.compile() == 'WHERE "x" = $v AND "y" = $v_1'
+    assert comp.params == {'v': 1, 'v_1': 2}
+
+
+def test_typed_properties_use_bind_processor():
+    props = compiler.Properties({'age': '3'}, types={'age': Integer()})
+    comp = compiler.CypherCompiler(compiler.Node(properties=props),
+                                   parameterized=True)
+    assert comp.params == {'age': 3}
+
+
+def test_cached_values_match_names_by_cache_key_position():
+    cache = compiler.CompiledCache()
+    comp, params = cache.compile(_where(1, 2), parameterized=True)
+    assert 'WHERE $low < $high' in comp.compile()
+    assert params == {'low': 1, 'high': 2}
+
+    cached, params = cache.compile(_where(10, 20), parameterized=True)
+    assert cached is comp
+    assert params == {'low': 10, 'high': 20}
+
+
+def test_shared_bind_parameter_is_collected_once():
+    value = compiler.BindParameter('v', 1)
+    stmt = compiler.Where(compiler.BinaryExpression('x', '=', value),
+                          compiler.BinaryExpression('y', '=', value))
+    collector = compiler.BindCollector()
+    stmt._gen_cache_key(collector)
+    assert list(collector) == [value]
+
+
+def test_mismatched_bind_parameters_are_rejected():
+    comp = compiler.CypherCompiler(_where(1, 2), parameterized=True)
+    with pytest.raises(exc.ArgumentError):
+        comp.construct_params([compiler.BindParameter('low', 1)])
+
+
+def test_cache_keeps_no_statement_or_values():
+    cache = compiler.CompiledCache()
+    rows = [{'name': 'm%d' % i} for i in range(3)]
+    stmt = compiler.Statement(compiler.Unwind(
+        compiler.BindParameter('rows', rows),
+        compiler.Variable(None, 'row')))
+    stmt_ref = weakref.ref(stmt)
+
+    comp, params = cache.compile(stmt, parameterized=True)
+    assert params == {'rows': rows}
+    del stmt
+    gc.collect()
+
+    assert stmt_ref() is None
+    assert comp.compile() == 'UNWIND $rows AS row'
+
+
+def test_distinct_binds_may_not_share_a_name():
+    stmt = compiler.Where(
+        compiler.BinaryExpression('x', '=', compiler.BindParameter('v', 1)),
+        compiler.BinaryExpression('y', '=', compiler.BindParameter('v', 2)))
+    with pytest.raises(exc.UnsupportedCompilationError):
+        compiler.CypherCompiler(stmt, parameterized=True)
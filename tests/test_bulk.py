@@ -0,0 +1,90 @@
+import pytest
+
+from neoalchemy import exc, ogm
+from neoalchemy.types import Integer, String
+
+from .stubs import StubResult
+
+
+class BulkMonkey(ogm.Node):
+    name = ogm.Prop(String)
+    age = ogm.Prop(Integer)
+
+
+def _create(statement, params):
+    rows = params['rows']
+    ids = [[i] for i in range(len(rows))] if 'RETURN' in statement else []
+    return StubResult(ids, stats={'nodes_created': len(rows),
+                                  'contains_updates': True})
+
+
+def test_bulk_create_chunks_lazily(engine):
+    engine.handler = _create
+    consumed = []
+
+    def rows():
+        for i in range(7):
+            consumed.append(i)
+            yield {'name': 'm%d' % i, 'age': str(i)}
+
+    assert BulkMonkey.nodes.bulk_create(rows(), batch_size=3) == 7
+    assert [len(params['rows'])
+            for statement, params in engine.executed] == [3, 3, 1]
+    assert 'UNWIND $rows AS row' in engine.statements[0]
+    assert 'CREATE (anon_1:BulkMonkey)' in engine.statements[0]
+    assert 'RETURN' not in engine.statements[0]
+    # Values are dehydrated by their props' types
+    assert engine.executed[0][1]['rows'][1] == {'name': 'm1', 'age': 1}
+    assert len(consumed) == 7
+
+
+def test_bulk_create_assigns_ids_to_instances(engine):
+    engine.handler = _create
+    monkeys = []
+    for i in range(5):
+        monkey = BulkMonkey()
+        monkey.name = 'm%d' % i
+        monkeys.append(monkey)
+
+    assert BulkMonkey.nodes.bulk_create(monkeys, batch_size=2) == 5
+    assert all('RETURN id(anon_1)' in s for s in engine.statements)
+    assert [ogm._instance_id(m) for m in monkeys] == [0, 1, 0, 1, 0]
+    assert ogm._instance_changes(monkeys[0]) == {}
+
+
+def test_bulk_create_requires_positive_batch_size(engine):
+    with pytest.raises(exc.ArgumentError):
+        BulkMonkey.nodes.bulk_create([{}], batch_size=0)
+    assert engine.executed == []
+
+
+def test_bulk_merge_counts_created_and_matched(engine):
+    created = iter([2, 0, 1])
+    engine.handler = lambda statement, params: StubResult(
+        stats={'nodes_created': next(created)})
+    rows = [{'name': 'm%d' % i, 'age': i} for i in range(5)]
+
+    result = BulkMonkey.nodes.bulk_merge(rows, on='name', batch_size=2)
+
+    assert (result.created, result.matched) == (3, 2)
+    assert engine.statements[0] == (
+        'UNWIND $rows AS row\n'
+        'MERGE (anon_1:BulkMonkey {name: row.name})\n'
+        'ON CREATE SET anon_1 = row\n'
+        'ON MATCH SET anon_1 += row')
+    assert [len(params['rows'])
+            for statement, params in engine.executed] == [2, 2, 1]
+
+
+def test_bulk_merge_on_several_props(engine):
+    BulkMonkey.nodes.bulk_merge([{'name': 'a', 'age': 1}],
+                                on=[BulkMonkey.name, 'age'])
+    assert '{age: row.age, name: row.name}' in engine.last_statement
+
+
+def test_bulk_merge_requires_merge_key_values(engine):
+    with pytest.raises(exc.ArgumentError):
+        BulkMonkey.nodes.bulk_merge([{'age': 1}], on='name')
+    with pytest.raises(exc.ArgumentError):
+        BulkMonkey.nodes.bulk_merge([{'name': 'a'}], on='colour')
+    assert engine.executed == []
@@ -0,0 +1,75 @@
+from neoalchemy import ogm
+from neoalchemy.cypher import compiler
+from neoalchemy.types import Integer, String
+
+
+class CompiledMonkey(ogm.Node):
+    name = ogm.Prop(String)
+    age = ogm.Prop(Integer)
+
+
+def _match(props):
+    return compiler.Statement(
+        compiler.Match(compiler.Node(
+            label='Monkey', variable=compiler.Variable(None, 'n'),
+            properties=compiler.Properties(props))),
+        compiler.Return(compiler.Variable(None, 'n')))
+
+
+def _shape(props):
+    return _match(props)._gen_cache_key(compiler.BindCollector())
+
+
+def test_same_shape_shares_cache_key():
+    assert (_match({'name': 'a'})._gen_cache_key() !=
+            _match({'name': 'b'})._gen_cache_key())
+    assert _shape({'name': 'a'}) == _shape({'name': 'b'})
+    assert _shape({'name': 'a'}) != _shape({'age': 1})
+
+
+def test_literal_types_are_part_of_cache_key():
+    assert (_match({'a': 1})._gen_cache_key() !=
+            _match({'a': True})._gen_cache_key())
+
+
+def test_compiled_cache_hits_on_same_shape():
+    cache = compiler.CompiledCache()
+    first, params = cache.compile(_match({'name': 'a'}), parameterized=True)
+    assert params == {'name': 'a'}
+    second, params = cache.compile(_match({'name': 'b'}), parameterized=True)
+
+    assert second is first
+    assert params == {'name': 'b'}
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert first.compile() == 'MATCH (n:Monkey {name: $name})\nRETURN n'
+
+
+def test_compiled_cache_inlines_unparameterized():
+    cache = compiler.CompiledCache()
+    comp, params = cache.compile(_match({'name': 'a'}))
+    assert params == {}
+    assert comp.compile() == 'MATCH (n:Monkey {name: "a"})\nRETURN n'
+    cache.compile(_match({'name': 'b'}))
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_compiled_cache_is_bounded():
+    cache = compiler.CompiledCache(capacity=2, threshold=0)
+    for key in ('a', 'b', 'c', 'd'):
+        cache.compile(_match({key: 1}), parameterized=True)
+    assert len(cache) == 2
+
+    cache.clear()
+    assert (len(cache), cache.hits, cache.misses) == (0, 0, 0)
+
+
+def test_query_reuses_compiled_statement(engine):
+    ogm.Query.compiled_cache.clear()
+    CompiledMonkey.nodes.filter(CompiledMonkey.name == 'a').all()
+    CompiledMonkey.nodes.filter(CompiledMonkey.name == 'b').all()
+
+    assert ogm.Query.compiled_cache.misses == 1
+    assert ogm.Query.compiled_cache.hits == 1
+    assert engine.statements[0] == engine.statements[1]
+    assert [params for statement, params in engine.executed] == [
+        {'name': 'a'}, {'name': 'b'}]
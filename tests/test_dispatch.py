@@ -0,0 +1,41 @@
+import pytest
+
+from neoalchemy import exc
+from neoalchemy.cypher import compiler
+
+
+class ShoutingCompiler(compiler.CypherCompiler):
+    def visit_match(self, match, **kw):
+        return super(ShoutingCompiler, self).visit_match(match, **kw) + '!'
+
+
+class Unknown(compiler.Element):
+    __visit_name__ = 'unknown'
+
+
+def _match():
+    return compiler.Match(compiler.Node(label='Monkey'))
+
+
+def test_dispatch_table_is_filled_on_first_visit():
+    compiler.CypherCompiler._dispatch_table.pop(compiler.Match, None)
+    assert compiler.CypherCompiler(_match()).compile() == 'MATCH (:Monkey)'
+    assert compiler.Match in compiler.CypherCompiler._dispatch_table
+
+
+def test_subclasses_get_their_own_dispatch_table():
+    assert ShoutingCompiler(_match()).compile() == 'MATCH (:Monkey)!'
+    assert compiler.CypherCompiler(_match()).compile() == 'MATCH (:Monkey)'
+    assert (ShoutingCompiler._dispatch_table is not
+            compiler.CypherCompiler._dispatch_table)
+
+
+def test_element_subclasses_dispatch_by_visit_name():
+    optional = compiler.OptionalMatch(compiler.Node(label='Monkey'))
+    assert (compiler.CypherCompiler(optional).compile() ==
+            'OPTIONAL MATCH (:Monkey)')
+
+
+def test_unsupported_element():
+    with pytest.raises(exc.UnsupportedCompilationError):
+        compiler.CypherCompiler(Unknown())
@@ -0,0 +1,114 @@
+import json
+import socket
+import time
+
+import pytest
+
+from neoalchemy.engine import ResultParser, _get_http_client, create_engine
+
+from .fakeserver import Drop
+
+
+def test_rows_are_streamed(server):
+    server.handler = lambda statement, params: [[i] for i in range(50)]
+    engine = create_engine(server.url)
+
+    result = engine.execute('RETURN 1')
+    assert result.columns == ['n']
+    assert next(iter(result)) == [0]
+    assert len(result.fetchall()) == 49
+    assert result.closed
+    assert engine.pool.checkedin() == 1
+
+
+def _response(rows):
+    data = json.dumps([{'row': row} for row in rows])
+    return ('{"results": [{"columns": ["n"], "data": %s}], "errors": []}' %
+            data).encode('utf-8')
+
+
+class _CountingDecoder(object):
+    def __init__(self, decoder):
+        self.decoder = decoder
+        self.calls = 0
+
+    def raw_decode(self, text, pos):
+        self.calls += 1
+        return self.decoder.raw_decode(text, pos)
+
+
+def test_large_row_is_decoded_once():
+    rows = [[['x' * 100 + '{"' for i in range(5000)]], [1]]
+    body = _response(rows)
+    parser = ResultParser()
+    parser._decoder = decoder = _CountingDecoder(parser._decoder)
+
+    parsed = []
+    for start in range(0, len(body), 8192):
+        parser.feed(body[start:start + 8192])
+        parsed.extend(parser.rows())
+    parser.close()
+
+    assert parsed == rows
+    # Once for the columns, then once per row
+    assert decoder.calls == 3
+
+
+def test_rows_split_anywhere():
+    rows = [['a "quoted" \\ {brace}', {'k': ['[', ']']}], [u'\u00e9']]
+    body = _response(rows)
+    parser = ResultParser()
+
+    parsed = []
+    for i in range(len(body)):
+        parser.feed(body[i:i + 1])
+        parsed.extend(parser.rows())
+    parser.close()
+
+    assert parsed == rows
+
+
+def test_connection_is_reused(server):
+    engine = create_engine(server.url, pool_size=1)
+    for i in range(3):
+        engine.execute('RETURN 1').fetchall()
+
+    assert len(server.requests) == 3
+    assert len(server.connections) == 1
+
+
+def test_connection_dropped_while_idle_is_replaced(server):
+    server.drop_idle = True
+    engine = create_engine(server.url, pool_size=1)
+    for i in range(3):
+        engine.execute('RETURN 1').fetchall()
+        time.sleep(0.05)
+
+    assert len(server.requests) == 3
+    assert len(server.connections) == 3
+
+
+def test_request_is_not_resent_once_sent(server):
+    def handler(statement, params):
+        if statement == 'CREATE (n)':
+            raise Drop()
+        return []
+    server.handler = handler
+    engine = create_engine(server.url, pool_size=1)
+    engine.execute('RETURN 1').fetchall()
+
+    with pytest.raises(_get_http_client().HTTPException):
+        engine.execute('CREATE (n)')
+    assert server.statements == ['RETURN 1', 'CREATE (n)']
+    assert engine.pool.checkedin() == 1
+
+
+def test_request_is_not_resent_on_timeout(server):
+    engine = create_engine(server.url, pool_size=1, timeout=0.1)
+    engine.execute('RETURN 1').fetchall()
+    server.delay = 0.3
+
+    with pytest.raises(socket.timeout):
+        engine.execute('CREATE (n)')
+    time.sleep(0.3)
+    assert server.statements == ['RETURN 1', 'CREATE (n)']
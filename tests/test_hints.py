@@ -0,0 +1,72 @@
+import pytest
+
+from neoalchemy import exc, ogm
+from neoalchemy.cypher import compiler
+from neoalchemy.types import String
+
+
+class HintedMonkey(ogm.Node):
+    name = ogm.Prop(String, index=True)
+
+
+class HintedBanana(ogm.Node):
+    colour = ogm.Prop(String)
+
+
+def _compiled(query):
+    comp, params = query._compile()
+    return comp.compile()
+
+
+def _shape(query):
+    return query._statement()._gen_cache_key(compiler.BindCollector())
+
+
+def test_hints_follow_match():
+    query = ogm.Query(HintedMonkey, HintedBanana).filter(
+        HintedMonkey.name == 'Bubbles').with_hint(
+        HintedMonkey.name, 'INDEX SEEK').using_scan(HintedBanana)
+
+    assert _compiled(query) == (
+        'MATCH (anon_1:HintedMonkey), (anon_2:HintedBanana)\n'
+        'USING INDEX SEEK anon_1:HintedMonkey(name)\n'
+        'USING SCAN anon_2:HintedBanana\n'
+        'WHERE anon_1.name = $name\n'
+        'RETURN id(anon_1), properties(anon_1), '
+        'id(anon_2), properties(anon_2)')
+
+
+def test_execution_options_prefix_statement():
+    query = HintedMonkey.nodes.get_query().execution_options(
+        planner='cost').execution_options(runtime='slotted')
+
+    assert _compiled(query) == (
+        'CYPHER planner=cost runtime=slotted\n'
+        'MATCH (anon_1:HintedMonkey)\n'
+        'RETURN id(anon_1), properties(anon_1)')
+
+
+def test_hints_and_options_are_part_of_cache_key():
+    query = HintedMonkey.nodes.filter(HintedMonkey.name == 'Bubbles')
+
+    assert _shape(query) == _shape(
+        HintedMonkey.nodes.filter(HintedMonkey.name == 'Coco'))
+    assert _shape(query) != _shape(query.with_hint(HintedMonkey.name))
+    assert _shape(query.with_hint(HintedMonkey.name)) != _shape(
+        query.with_hint(HintedMonkey.name, 'INDEX SEEK'))
+    assert _shape(query.execution_options(runtime='slotted')) != _shape(
+        query.execution_options(runtime='pipelined'))
+
+
+def test_invalid_hints_and_options():
+    query = HintedMonkey.nodes.get_query()
+    with pytest.raises(exc.ArgumentError):
+        query.with_hint(HintedMonkey.name, 'TEXT')
+    with pytest.raises(exc.ArgumentError):
+        query.with_hint(HintedBanana.colour)
+    with pytest.raises(exc.ArgumentError):
+        query.using_scan(HintedBanana)
+    with pytest.raises(exc.ArgumentError):
+        query.execution_options(version='4.4')
+    with pytest.raises(exc.ArgumentError):
+        query.execution_options(runtime='slotted MATCH (n) DELETE n')
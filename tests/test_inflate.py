@@ -0,0 +1,55 @@
+from neoalchemy import ogm
+from neoalchemy.types import Integer, String
+
+
+class InflatedMonkey(ogm.Node):
+    name = ogm.Prop(String)
+    age = ogm.Prop(Integer)
+
+    def __init__(self):
+        raise AssertionError('inflating must not call __init__')
+
+
+def test_inflate_processes_values():
+    monkey = InflatedMonkey._impl.inflate(7, {'name': 'Bubbles', 'age': '3'})
+    assert isinstance(monkey, InflatedMonkey)
+    assert ogm._instance_id(monkey) == 7
+    assert (monkey.name, monkey.age) == ('Bubbles', 3)
+
+
+def test_inflate_leaves_missing_and_unmapped_props():
+    monkey = InflatedMonkey._impl.inflate(1, {'age': None, 'extra': 'x'})
+    assert monkey.name is None and monkey.age is None
+    assert ogm._instance_state(monkey)['extra'] == 'x'
+
+
+def test_generated_functions_read_processors_as_locals():
+    impl = InflatedMonkey._impl
+    impl.configure()
+    for function in (impl._inflater, impl._dehydrater):
+        code = function.__code__
+        assert not [name for name in code.co_names
+                    if name.startswith('processor_') or name == 'node_type']
+
+
+def test_dehydrate_copies_and_processes():
+    props = {'name': 'Bubbles', 'age': '3'}
+    assert InflatedMonkey._impl.dehydrate(props) == {
+        'name': 'Bubbles', 'age': 3}
+    assert props['age'] == '3'
+
+
+def test_mapping_changes_regenerate_inflater():
+    class RemappedMonkey(ogm.Node):
+        name = ogm.Prop(String)
+
+    info = ogm._instance_info(RemappedMonkey)
+    size = ogm.Prop(Integer)
+    size._set_name('size')
+    info.add_property(size)
+    monkey = RemappedMonkey._impl.inflate(1, {'size': '4'})
+    assert ogm._instance_state(monkey)['size'] == 4
+
+    info.remove_property(size)
+    monkey = RemappedMonkey._impl.inflate(1, {'size': '4'})
+    assert ogm._instance_state(monkey)['size'] == '4'
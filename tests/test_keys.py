@@ -0,0 +1,98 @@
+import pytest
+
+from neoalchemy import exc, ogm
+from neoalchemy.session import Session
+from neoalchemy.types import Integer, String
+
+
+class KeyedMonkey(ogm.Node):
+    uid = ogm.Prop(String, primary_key=True)
+    name = ogm.Prop(String)
+
+
+class UnkeyedMonkey(ogm.Node):
+    name = ogm.Prop(String)
+
+
+def _existing(*uids):
+    """Answer lookups by uid with the nodes among uids"""
+    def handler(statement, params):
+        return [[ord(uid), {'uid': uid}]
+                for uid in params['uid'] if uid in uids]
+    return handler
+
+
+def test_primary_key_is_unique():
+    info = ogm._instance_info(KeyedMonkey)
+    assert info.primary_key is KeyedMonkey.uid
+    assert KeyedMonkey.uid.unique
+    assert ogm._instance_info(UnkeyedMonkey).primary_key is None
+
+
+def test_single_primary_key():
+    with pytest.raises(exc.ArgumentError):
+        class TwoKeyMonkey(ogm.Node):
+            uid = ogm.Prop(String, primary_key=True)
+            number = ogm.Prop(Integer, primary_key=True)
+
+
+def test_get_many_keeps_order_of_keys(engine):
+    engine.handler = _existing('a', 'b', 'c')
+
+    monkeys = KeyedMonkey.nodes.get_many(['b', 'x', 'a', 'b'], chunk_size=2)
+
+    assert [monkey and monkey.uid for monkey in monkeys] == [
+        'b', None, 'a', 'b']
+    assert monkeys[0] is monkeys[3]
+    # Duplicate keys are looked up once
+    assert [params for statement, params in engine.executed] == [
+        {'uid': ['b', 'x']}, {'uid': ['a']}]
+    assert engine.statements[0] == (
+        'MATCH (anon_1:KeyedMonkey)\n'
+        'WHERE anon_1.uid IN $uid\n'
+        'RETURN id(anon_1), properties(anon_1)')
+
+
+def test_get(engine):
+    engine.handler = _existing('a')
+
+    assert KeyedMonkey.nodes.get('a').uid == 'a'
+    assert KeyedMonkey.nodes.get('b') is None
+    with pytest.raises(exc.ArgumentError):
+        KeyedMonkey.nodes.get_many(['a'], chunk_size=0)
+
+
+def test_get_without_primary_key_uses_node_id(engine):
+    engine.handler = lambda statement, params: [[7, {'name': 'Bubbles'}]]
+
+    assert UnkeyedMonkey.nodes.get(7).name == 'Bubbles'
+    assert 'WHERE id(anon_1) IN $node_id' in engine.last_statement
+    assert engine.last_params == {'node_id': [7]}
+
+
+def test_get_many_through_session_skips_loaded_keys(engine):
+    engine.handler = _existing('a', 'b')
+    session = Session()
+    bubbles = KeyedMonkey.nodes.get('a', session=session)
+
+    monkeys = KeyedMonkey.nodes.get_many(['a', 'b'], session=session)
+
+    assert monkeys[0] is bubbles
+    assert monkeys[1].uid == 'b'
+    assert engine.last_params == {'uid': ['b']}
+
+
+def test_session_finds_loaded_instances_by_key(engine):
+    engine.handler = lambda statement, params: [
+        [ord(uid), {'uid': uid}] for uid in params.get('uid', 'abc')]
+    session = Session()
+    monkeys = session.query(KeyedMonkey).all()
+
+    assert session.get(KeyedMonkey, 'b') is monkeys[1]
+    assert len(engine.executed) == 1
+    assert set(session._by_key[KeyedMonkey]) == set('abc')
+
+    session.expunge(monkeys[0])
+    assert 'a' not in session._by_key[KeyedMonkey]
+    assert session.get(KeyedMonkey, 'a') is not monkeys[0]
+    assert engine.last_params == {'uid': ['a']}
@@ -0,0 +1,90 @@
+import pytest
+
+from neoalchemy import exc, ogm
+from neoalchemy.plan import Plan
+from neoalchemy.types import String
+
+from .stubs import StubResult
+
+
+class PlannedMonkey(ogm.Node):
+    name = ogm.Prop(String)
+
+
+PROFILE = {
+    'root': {
+        'operatorType': 'ProduceResults@neo4j',
+        'identifiers': ['n'],
+        'arguments': {'Rows': 2, 'DbHits': 0, 'EstimatedRows': 2.5},
+        'children': [{
+            'operatorType': 'Filter@neo4j',
+            'identifiers': ['n'],
+            'DbHits': 10,
+            'Rows': 2,
+            'Details': 'n.name = $name',
+            'children': [{
+                'operatorType': 'AllNodesScan@neo4j',
+                'identifiers': ['n'],
+                'arguments': {'DbHits': 11, 'Rows': 10,
+                              'PageCacheHits': 3, 'PageCacheMisses': 0},
+            }],
+        }],
+    },
+}
+
+
+def test_from_result_parses_operators():
+    plan = Plan.from_result({'profile': PROFILE})
+
+    assert [p.operator for p in plan.walk()] == [
+        'ProduceResults', 'Filter', 'AllNodesScan']
+    assert (plan.rows, plan.db_hits, plan.estimated_rows) == (2, 0, 2.5)
+    produce, filter_, scan = plan.walk()
+    # Details may be inlined rather than nested in arguments
+    assert filter_.arguments == {'Details': 'n.name = $name'}
+    assert (scan.page_cache_hits, scan.page_cache_misses) == (3, 0)
+    assert scan.identifiers == ['n']
+    assert plan.total_db_hits == 21
+
+
+def test_explained_plan_has_no_counters():
+    plan = Plan.from_result({'plan': {'root': {
+        'operatorType': 'NodeByLabelScan', 'identifiers': ['n'],
+        'arguments': {'EstimatedRows': 5.0}}}})
+
+    assert plan.rows is None
+    assert plan.total_db_hits is None
+    assert plan.render() == '+NodeByLabelScan (n) estimated rows 5'
+
+
+def test_from_result_requires_plan():
+    with pytest.raises(exc.DatabaseError):
+        Plan.from_result({'columns': []})
+    with pytest.raises(exc.DatabaseError):
+        Plan.from_result(None)
+
+
+def test_warnings_and_render_flag_slow_operators():
+    plan = Plan.from_result({'profile': PROFILE})
+
+    assert plan.warnings() == [
+        'AllNodesScan of n scans every node in the graph']
+    assert plan.render() == (
+        '+ProduceResults (n) estimated rows 2.5, rows 2, db hits 0\n'
+        '  +Filter (n) rows 2, db hits 10\n'
+        '    +AllNodesScan (n) rows 10, db hits 11, page cache hits 3, '
+        'page cache misses 0 [!]')
+
+
+def test_profile_runs_prefixed_statement(engine):
+    engine.handler = lambda statement, params: StubResult(
+        result={'profile': PROFILE})
+
+    plan = PlannedMonkey.nodes.filter(PlannedMonkey.name == 'a').profile()
+
+    assert plan.operator == 'ProduceResults'
+    assert engine.last_statement.startswith('PROFILE\nMATCH')
+    assert engine.last_params == {'name': 'a'}
+
+    PlannedMonkey.nodes.get_query().explain()
+    assert engine.last_statement.startswith('EXPLAIN\nMATCH')
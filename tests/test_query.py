@@ -0,0 +1,202 @@
+import pytest
+
+from neoalchemy import exc, ogm
+from neoalchemy.types import Float, Integer, String
+
+
+class QueryMonkey(ogm.Node):
+    name = ogm.Prop(String)
+    age = ogm.Prop(Integer)
+    weight = ogm.Prop('weight_kg', Float)
+
+
+class QueryTree(ogm.Node):
+    name = ogm.Prop(String)
+
+
+def _compiled(query):
+    comp, params = query._compile()
+    return comp.compile(), params
+
+
+def test_filter_compiles_where_clause():
+    query = QueryMonkey.nodes.filter(
+        QueryMonkey.name == 'Bubbles', QueryMonkey.age.between(1, '5'),
+        QueryMonkey.weight != None).filter(
+        QueryMonkey.name.in_(['Coco', 'Momo']),
+        QueryMonkey.name.startswith('B'))
+
+    assert _compiled(query) == (
+        'MATCH (anon_1:QueryMonkey)\n'
+        'WHERE anon_1.name = $name AND anon_1.age >= $age AND '
+        'anon_1.age <= $age_1 AND anon_1.weight_kg IS NOT NULL AND '
+        'anon_1.name IN $name_1 AND anon_1.name STARTS WITH $name_2\n'
+        'RETURN id(anon_1), properties(anon_1)',
+        {'name': 'Bubbles', 'age': 1, 'age_1': 5,
+         'name_1': ['Coco', 'Momo'], 'name_2': 'B'})
+
+
+def test_filter_by_uses_prop_names():
+    query = QueryMonkey.nodes.filter_by(name='Bubbles', weight=2)
+
+    statement, params = _compiled(query)
+    assert ('WHERE anon_1.name = $name AND anon_1.weight_kg = $weight_kg'
+            in statement)
+    assert params == {'name': 'Bubbles', 'weight_kg': 2.0}
+
+
+def test_filter_rejects_unknown_criteria():
+    with pytest.raises(exc.ArgumentError):
+        QueryMonkey.nodes.filter(True)
+    with pytest.raises(exc.ArgumentError):
+        QueryMonkey.nodes.filter_by(colour='brown')
+
+
+def test_comparison_has_no_truth_value():
+    with pytest.raises(TypeError):
+        bool(QueryMonkey.name == 'Bubbles')
+    with pytest.raises(TypeError):
+        if QueryMonkey.age > 3:
+            pass
+
+
+def _names_after(statement, params):
+    """Answer a query paged by name, from the names a to g"""
+    names = [name for name in 'abcdefg' if name > params.get('name', '')]
+    return [[ord(name), {'name': name}] for name in names[:params['limit']]]
+
+
+def test_order_by_offset_and_limit():
+    query = QueryMonkey.nodes.filter(QueryMonkey.age > 1).order_by(
+        QueryMonkey.name.desc(), QueryMonkey.age).offset(10).limit(5)
+
+    assert _compiled(query) == (
+        'MATCH (anon_1:QueryMonkey)\n'
+        'WHERE anon_1.age > $age\n'
+        'RETURN id(anon_1), properties(anon_1)\n'
+        'ORDER BY anon_1.name DESC, anon_1.age\n'
+        'SKIP $offset\n'
+        'LIMIT $limit',
+        {'age': 1, 'limit': 5, 'offset': 10})
+    assert 'ORDER BY' not in _compiled(query.order_by(None))[0]
+
+
+def test_limit_and_offset_must_not_be_negative():
+    with pytest.raises(exc.ArgumentError):
+        QueryMonkey.nodes.get_query().limit(-1)
+    with pytest.raises(exc.ArgumentError):
+        QueryMonkey.nodes.get_query().offset(-1)
+
+
+def test_iter_pages_continues_after_last_key(engine):
+    engine.handler = _names_after
+    query = QueryMonkey.nodes.get_query()
+
+    pages = [[monkey.name for monkey in page]
+             for page in query.iter_pages(QueryMonkey.name, page_size=3)]
+
+    assert pages == [['a', 'b', 'c'], ['d', 'e', 'f'], ['g']]
+    assert [params for statement, params in engine.executed] == [
+        {'limit': 3}, {'limit': 3, 'name': 'c'}, {'limit': 3, 'name': 'f'}]
+    assert engine.last_statement == (
+        'MATCH (anon_1:QueryMonkey)\n'
+        'WHERE anon_1.name IS NOT NULL AND anon_1.name > $name\n'
+        'RETURN id(anon_1), properties(anon_1)\n'
+        'ORDER BY anon_1.name\n'
+        'LIMIT $limit')
+
+
+def test_iter_pages_by_node_id(engine):
+    engine.handler = lambda statement, params: [
+        [i, {}] for i in range(params.get('last_key', -1) + 1, 4)][:2]
+
+    pages = list(QueryMonkey.nodes.get_query().iter_pages(page_size=2))
+
+    assert [[ogm._instance_id(m) for m in page] for page in pages] == [
+        [0, 1], [2, 3]]
+    # A full last page takes one more query to find the end
+    assert len(engine.executed) == 3
+    assert 'id(anon_1) > $last_key' in engine.last_statement
+    assert 'ORDER BY id(anon_1)' in engine.last_statement
+
+
+def test_iter_pages_sorts_and_bounds_itself():
+    query = QueryMonkey.nodes.get_query()
+    with pytest.raises(exc.InvalidRequestError):
+        next(query.limit(5).iter_pages())
+    with pytest.raises(exc.ArgumentError):
+        next(query.iter_pages(page_size=0))
+
+
+def test_load_only_returns_only_given_props(engine):
+    engine.handler = lambda statement, params: [[3, {'name': 'Bubbles'}]]
+    query = QueryMonkey.nodes.get_query().load_only(QueryMonkey.name)
+
+    assert _compiled(query)[0] == (
+        'MATCH (anon_1:QueryMonkey)\n'
+        'RETURN id(anon_1), {name: anon_1.name}')
+    monkey = query.all()[0]
+    assert (monkey.name, monkey.age) == ('Bubbles', None)
+    assert ogm._instance_id(monkey) == 3
+
+
+def test_defer_leaves_out_props():
+    query = QueryMonkey.nodes.get_query().defer(QueryMonkey.weight)
+
+    assert _compiled(query)[0] == (
+        'MATCH (anon_1:QueryMonkey)\n'
+        'RETURN id(anon_1), {age: anon_1.age, name: anon_1.name}')
+
+
+def test_values_returns_keyed_tuples(engine):
+    engine.handler = lambda statement, params: [['Bubbles', '4.5']]
+
+    rows = list(QueryMonkey.nodes.get_query().values(
+        QueryMonkey.name, QueryMonkey.weight))
+
+    assert engine.last_statement == (
+        'MATCH (anon_1:QueryMonkey)\n'
+        'RETURN anon_1.name, anon_1.weight_kg')
+    assert rows == [('Bubbles', 4.5)]
+    assert rows[0].keys() == ['name', 'weight_kg']
+    assert rows[0].weight_kg == 4.5
+
+
+def test_projections_require_props_of_queried_entities():
+    query = QueryMonkey.nodes.get_query()
+    for method in (query.load_only, query.defer, query.values):
+        with pytest.raises(exc.ArgumentError):
+            method(QueryTree.name)
+    with pytest.raises(exc.ArgumentError):
+        query.values()
+
+
+def test_count(engine):
+    engine.handler = lambda statement, params: [[7]]
+
+    assert QueryMonkey.nodes.count() == 7
+    assert engine.last_statement == (
+        'MATCH (anon_1:QueryMonkey)\n'
+        'RETURN count(*)')
+
+    query = QueryMonkey.nodes.filter(QueryMonkey.age > 2).limit(3)
+    assert query.count() == 7
+    # The bounds of the query apply before counting
+    assert engine.last_statement == (
+        'MATCH (anon_1:QueryMonkey)\n'
+        'WHERE anon_1.age > $age\n'
+        'WITH anon_1\n'
+        'LIMIT $limit\n'
+        'RETURN count(*)')
+    assert engine.last_params == {'age': 2, 'limit': 3}
+
+
+def test_exists_stops_at_first_match(engine):
+    engine.handler = lambda statement, params: [[True]]
+
+    assert QueryMonkey.nodes.filter(QueryMonkey.age > 2).exists() is True
+    assert engine.last_statement.endswith(
+        'WITH anon_1\n'
+        'LIMIT $limit\n'
+        'RETURN count(*) > 0')
+    assert engine.last_params == {'age': 2, 'limit': 1}
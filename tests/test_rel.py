@@ -0,0 +1,178 @@
+import pytest
+
+from neoalchemy import exc, ogm
+from neoalchemy.session import Session
+from neoalchemy.types import Integer, String
+
+from .stubs import StubEngine
+
+
+class RelBanana(ogm.Node):
+    ripeness = ogm.Prop(Integer)
+
+
+class RelLike(ogm.RelEntity):
+    __label__ = 'LIKES'
+    since = ogm.Prop(Integer)
+
+
+class RelMonkey(ogm.Node):
+    name = ogm.Prop(String)
+    bananas = ogm.Rel('EATS', RelBanana)
+    friends = ogm.Rel('FRIEND', 'RelMonkey', direction=ogm.BOTH)
+    fans = ogm.Rel(RelLike, 'RelBanana', direction=ogm.INCOMING)
+
+
+def _compiled(query):
+    comp, params = query._compile()
+    return comp.compile(), params
+
+
+def test_join_filters_on_target():
+    query = ogm.Query(RelMonkey).join(RelMonkey.bananas).filter(
+        RelBanana.ripeness > 2)
+
+    assert _compiled(query) == (
+        'MATCH (anon_1:RelMonkey), '
+        '(anon_1)-[:EATS]->(anon_2:RelBanana)\n'
+        'WHERE anon_2.ripeness > $ripeness\n'
+        'RETURN id(anon_1), properties(anon_1)',
+        {'ripeness': 2})
+
+
+def test_join_binds_queried_target(engine):
+    engine.handler = lambda statement, params: [
+        [1, {'name': 'Bubbles'}, 2, {'ripeness': '3'}]]
+    query = ogm.Query(RelMonkey, RelBanana).join(RelMonkey.bananas)
+
+    assert _compiled(query)[0] == (
+        'MATCH (anon_1:RelMonkey), (anon_2:RelBanana), '
+        '(anon_1)-[:EATS]->(anon_2:RelBanana)\n'
+        'RETURN id(anon_1), properties(anon_1), '
+        'id(anon_2), properties(anon_2)')
+    monkey, banana = query.all()[0]
+    assert (monkey.name, banana.ripeness) == ('Bubbles', 3)
+
+
+def test_self_referential_join_traverses_hops():
+    query = ogm.Query(RelMonkey).join(RelMonkey.friends).join(
+        RelMonkey.friends)
+
+    assert _compiled(query)[0] == (
+        'MATCH (anon_1:RelMonkey), '
+        '(anon_1)-[:FRIEND]-(friends_1:RelMonkey), '
+        '(friends_1)-[:FRIEND]-(friends_2:RelMonkey)\n'
+        'RETURN id(anon_1), properties(anon_1)')
+
+
+def test_join_rel_entity():
+    query = ogm.Query(RelMonkey, RelLike).join(RelMonkey.fans).filter(
+        RelLike.since > 2000)
+
+    assert _compiled(query) == (
+        'MATCH (anon_1:RelMonkey), '
+        '(anon_1)<-[anon_2:LIKES]-(anon_3:RelBanana)\n'
+        'WHERE anon_2.since > $since\n'
+        'RETURN id(anon_1), properties(anon_1), '
+        'id(anon_2), properties(anon_2)',
+        {'since': 2000})
+
+
+def test_join_requires_rel_of_queried_class():
+    with pytest.raises(exc.ArgumentError):
+        ogm.Query(RelBanana).join(RelMonkey.bananas)
+    with pytest.raises(exc.ArgumentError):
+        ogm.Query(RelMonkey).join(RelMonkey.name)
+
+
+def test_rel_loads_on_first_access(engine):
+    engine.handler = lambda statement, params: [[2, {'ripeness': 1}]]
+    assert RelMonkey().bananas == []
+    assert engine.executed == []
+
+    monkey = RelMonkey()
+    setattr(monkey, ogm.NA_ID_INSTANCE_VAR, 1)
+    bananas = monkey.bananas
+    assert monkey.bananas is bananas
+    assert [banana.ripeness for banana in bananas] == [1]
+    assert len(engine.executed) == 1
+    assert engine.last_statement == (
+        'MATCH (anon_1:RelBanana), (source)-[:EATS]->(anon_1:RelBanana)\n'
+        'WHERE id(source) = $source_id\n'
+        'RETURN id(anon_1), properties(anon_1)')
+    assert engine.last_params == {'source_id': 1}
+
+
+def test_rel_loads_with_engine_of_instance(engine):
+    other = StubEngine(lambda statement, params: [[1, {'name': 'Bubbles'}]])
+    monkey = ogm.Query(RelMonkey).with_engine(other).all()[0]
+
+    other.handler = lambda statement, params: [[2, {'ripeness': 1}]]
+    assert [banana.ripeness for banana in monkey.bananas] == [1]
+    assert len(other.executed) == 2
+    assert engine.executed == []
+
+
+def test_eager_collects_related_in_same_query(engine):
+    engine.handler = lambda statement, params: [
+        [1, {'name': 'Bubbles'}, [3, 4], [{'ripeness': 1}, {'ripeness': 2}],
+         [2], [{'name': 'Coco'}]],
+        [2, {'name': 'Coco'}, [], [], [1], [{'name': 'Bubbles'}]],
+    ]
+    query = ogm.Query(RelMonkey).filter(RelMonkey.name != 'Momo').options(
+        ogm.eager(RelMonkey.bananas), ogm.eager(RelMonkey.friends))
+
+    bubbles, coco = query.all()
+
+    assert engine.last_statement == (
+        'MATCH (anon_1:RelMonkey)\n'
+        'WHERE anon_1.name <> $name\n'
+        'OPTIONAL MATCH (anon_1)-[:EATS]->(bananas_eager_1:RelBanana)\n'
+        'WITH anon_1, collect(id(bananas_eager_1)) AS bananas_ids_1, '
+        'collect(properties(bananas_eager_1)) AS bananas_props_1\n'
+        'OPTIONAL MATCH (anon_1)-[:FRIEND]-(friends_eager_2:RelMonkey)\n'
+        'WITH anon_1, bananas_ids_1, bananas_props_1, '
+        'collect(id(friends_eager_2)) AS friends_ids_2, '
+        'collect(properties(friends_eager_2)) AS friends_props_2\n'
+        'RETURN id(anon_1), properties(anon_1), bananas_ids_1, '
+        'bananas_props_1, friends_ids_2, friends_props_2')
+    assert [banana.ripeness for banana in bubbles.bananas] == [1, 2]
+    assert [ogm._instance_id(b) for b in bubbles.bananas] == [3, 4]
+    assert coco.bananas == []
+    assert bubbles.friends[0].name == 'Coco'
+    assert len(engine.executed) == 1
+
+
+def test_eager_loads_into_session(engine):
+    engine.handler = lambda statement, params: [
+        [1, {'name': 'Bubbles'}, [2], [{'name': 'Coco'}]],
+        [2, {'name': 'Coco'}, [1], [{'name': 'Bubbles'}]],
+    ]
+    session = Session()
+
+    bubbles, coco = session.query(RelMonkey).options(
+        ogm.eager(RelMonkey.friends)).all()
+
+    assert bubbles.friends == [coco]
+    assert coco.friends == [bubbles]
+    assert len(engine.executed) == 1
+
+
+def test_eager_follows_order_and_bounds():
+    query = ogm.Query(RelMonkey).options(
+        ogm.eager(RelMonkey.friends)).order_by(RelMonkey.name).offset(
+        5).limit(10)
+
+    assert _compiled(query) == (
+        'MATCH (anon_1:RelMonkey)\n'
+        'WITH anon_1\n'
+        'ORDER BY anon_1.name\n'
+        'SKIP $offset\n'
+        'LIMIT $limit\n'
+        'OPTIONAL MATCH (anon_1)-[:FRIEND]-(friends_eager_1:RelMonkey)\n'
+        'WITH anon_1, collect(id(friends_eager_1)) AS friends_ids_1, '
+        'collect(properties(friends_eager_1)) AS friends_props_1\n'
+        'RETURN id(anon_1), properties(anon_1), friends_ids_1, '
+        'friends_props_1\n'
+        'ORDER BY anon_1.name',
+        {'offset': 5, 'limit': 10})
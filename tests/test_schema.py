@@ -0,0 +1,127 @@
+import pytest
+
+from neoalchemy import exc, ogm, schema
+from neoalchemy.types import Integer, String
+
+from .stubs import StubEngine, StubResult
+
+
+class SchemaMonkey(ogm.Node):
+    uid = ogm.Prop(String, primary_key=True)
+    name = ogm.Prop(String, index=True)
+    age = ogm.Prop(Integer, index=True)
+    email = ogm.Prop(String, unique=True)
+
+
+class _Output(object):
+    def __init__(self):
+        self.written = []
+
+    def write(self, text):
+        self.written.append(text)
+
+
+def _server(indexes=(), constraints=()):
+    """An engine whose server has the given indexes, as db.indexes() records,
+    and constraints, as descriptions
+    """
+    def handler(statement, params):
+        if statement == 'CALL db.indexes()':
+            return StubResult(
+                [[index.get('labelsOrTypes'), index.get('properties'),
+                  index.get('description')] for index in indexes],
+                columns=['labelsOrTypes', 'properties', 'description'])
+        if statement == 'CALL db.constraints()':
+            return StubResult([[description] for description in constraints],
+                              columns=['description'])
+        return []
+    return StubEngine(handler)
+
+
+def test_declared():
+    indexes, constraints = schema.MetaData(SchemaMonkey).declared()
+
+    assert list(indexes) == [schema.Index('SchemaMonkey', 'age'),
+                             schema.Index('SchemaMonkey', 'name')]
+    assert list(constraints) == [
+        schema.UniqueConstraint('SchemaMonkey', 'email'),
+        schema.UniqueConstraint('SchemaMonkey', 'uid')]
+
+
+def _indexed_server():
+    return _server(
+        indexes=[{'labelsOrTypes': ['SchemaMonkey'], 'properties': ['age']},
+                 {'description': 'INDEX ON :SchemaMonkey(email)'}],
+        constraints=['CONSTRAINT ON ( m:SchemaMonkey ) ASSERT m.uid IS '
+                     'UNIQUE'])
+
+
+def test_create_all_dry_run_writes_missing_ddl():
+    engine = _indexed_server()
+    out = _Output()
+
+    ddl = schema.MetaData(SchemaMonkey).create_all(engine, dry_run=True,
+                                                   file=out)
+
+    # The index in the way of the email constraint is kept
+    assert ddl == ['CREATE INDEX ON :SchemaMonkey(name)']
+    assert out.written == [
+        '// Not created, as an index is in the way; pass '
+        'replace_indexes=True to replace it: CREATE CONSTRAINT ON '
+        '(n:SchemaMonkey) ASSERT n.email IS UNIQUE\n',
+        'CREATE INDEX ON :SchemaMonkey(name);\n']
+    assert engine.statements == ['CALL db.indexes()',
+                                 'CALL db.constraints()']
+
+
+def test_create_all_replaces_indexes_on_request():
+    ddl = schema.MetaData(SchemaMonkey).create_all(
+        _indexed_server(), dry_run=True, file=_Output(), replace_indexes=True)
+
+    assert ddl == [
+        'DROP INDEX ON :SchemaMonkey(email)',
+        'CREATE CONSTRAINT ON (n:SchemaMonkey) ASSERT n.email IS UNIQUE',
+        'CREATE INDEX ON :SchemaMonkey(name)',
+    ]
+
+
+def test_replaced_index_is_restored_if_constraint_fails():
+    engine = _indexed_server()
+    handler = engine.handler
+
+    def failing_constraint(statement, params):
+        if statement.startswith('CREATE CONSTRAINT'):
+            raise exc.DatabaseError('Nodes share a value')
+        return handler(statement, params)
+    engine.handler = failing_constraint
+
+    with pytest.raises(exc.DatabaseError):
+        schema.MetaData(SchemaMonkey).create_all(engine, replace_indexes=True)
+    assert engine.statements[2:] == [
+        'DROP INDEX ON :SchemaMonkey(email)',
+        'CREATE CONSTRAINT ON (n:SchemaMonkey) ASSERT n.email IS UNIQUE',
+        'CREATE INDEX ON :SchemaMonkey(email)',
+    ]
+
+
+def test_create_all_runs_each_statement():
+    engine = _server()
+
+    ddl = schema.MetaData(SchemaMonkey).create_all(engine)
+
+    assert len(ddl) == 4
+    assert engine.statements[2:] == ddl
+
+
+def test_reflect_index_records():
+    assert schema._reflect_index({
+        'labelsOrTypes': ['Monkey'], 'properties': ['name'],
+        'entityType': 'NODE'}) == schema.Index('Monkey', 'name')
+    assert schema._reflect_index({
+        'labelsOrTypes': ['Monkey'], 'properties': ['name', 'age']}) is None
+    assert schema._reflect_index({
+        'labelsOrTypes': ['LIKES'], 'properties': ['since'],
+        'entityType': 'RELATIONSHIP'}) is None
+    assert schema._reflect_index({
+        'description': 'INDEX ON :`Monkey`(`name`)'}) == schema.Index(
+        'Monkey', 'name')
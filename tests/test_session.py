@@ -0,0 +1,261 @@
+import gc
+import itertools
+
+import pytest
+
+from neoalchemy import exc, ogm
+from neoalchemy.session import Session
+from neoalchemy.types import Integer, String
+
+from .stubs import StubEngine
+
+
+class SessionMonkey(ogm.Node):
+    name = ogm.Prop(String)
+    age = ogm.Prop(Integer)
+    friends = ogm.Rel('FRIEND', 'SessionMonkey')
+
+
+class SessionTree(ogm.Node):
+    height = ogm.Prop(Integer)
+
+
+@pytest.fixture
+def session():
+    node_ids = itertools.count(100)
+
+    def handler(statement, params):
+        if 'CREATE' in statement:
+            return [[next(node_ids)] for row in params['rows']]
+        if 'SET' in statement:
+            return []
+        return [[1, {'name': 'Bubbles', 'age': 3}],
+                [2, {'name': 'Coco', 'age': 5}]]
+    return Session(StubEngine(handler))
+
+
+def test_identity_map_returns_same_instance(session):
+    first = session.query(SessionMonkey).all()
+    second = session.query(SessionMonkey).all()
+
+    assert second[0] is first[0]
+    assert second[1] is first[1]
+    assert session.identity_map[1] is first[0]
+    assert first[0] in session
+
+
+def test_flush_creates_new_instances_per_class(session):
+    monkeys = [SessionMonkey(), SessionMonkey()]
+    for i, monkey in enumerate(monkeys):
+        monkey.name = 'm%d' % i
+    tree = SessionTree()
+    tree.height = 10
+    session.add_all(monkeys + [tree])
+    assert session.new == monkeys + [tree]
+
+    session.flush()
+
+    engine = session.engine
+    assert len(engine.executed) == 2
+    assert engine.executed[0][1] == {
+        'rows': [{'name': 'm0'}, {'name': 'm1'}]}
+    assert ':SessionTree' in engine.statements[1]
+    assert [ogm._instance_id(m) for m in monkeys] == [100, 101]
+    assert ogm._instance_id(tree) == 102
+    assert session.identity_map[100] is monkeys[0]
+    assert session.new == []
+
+
+def test_flush_sends_only_changed_props(session):
+    bubbles, coco = session.query(SessionMonkey).all()
+    bubbles.name = 'Bubbles II'
+    coco.age = 5
+    assert session.dirty == [bubbles]
+
+    session.flush()
+
+    assert 'SET n += row.props' in session.engine.last_statement
+    assert session.engine.last_params == {
+        'rows': [{'id': 1, 'props': {'name': 'Bubbles II'}}]}
+    assert session.dirty == []
+
+
+def test_flush_without_changes_sends_nothing(session):
+    session.query(SessionMonkey).all()
+    session.flush()
+    assert len(session.engine.executed) == 1
+
+
+def test_add_conflicting_instance(session):
+    loaded = session.query(SessionMonkey).all()
+    other = SessionMonkey()
+    setattr(other, ogm.NA_ID_INSTANCE_VAR, 1)
+
+    with pytest.raises(exc.InvalidRequestError):
+        session.add(other)
+    assert session.identity_map[1] is loaded[0]
+
+
+def test_expunge(session):
+    bubbles, coco = session.query(SessionMonkey).all()
+    bubbles.name = 'Bubbles II'
+    session.expunge(bubbles)
+
+    assert bubbles not in session
+    assert ogm._instance_session(bubbles) is None
+    session.flush()
+    assert len(session.engine.executed) == 1
+
+
+def test_changes_survive_dropped_references(session):
+    session.query(SessionMonkey).all()[0].name = 'Bubbles II'
+    gc.collect()
+    assert session.identity_map.get(2) is None
+
+    session.flush()
+
+    assert session.engine.last_params == {
+        'rows': [{'id': 1, 'props': {'name': 'Bubbles II'}}]}
+    gc.collect()
+    assert session.identity_map.get(1) is None
+
+
+def test_prop_set_back_is_tracked_again(session):
+    bubbles = session.query(SessionMonkey).all()[0]
+    bubbles.name = 'Bubbles'
+    session.flush()
+    assert len(session.engine.executed) == 1
+
+    bubbles.name = 'Bubbles II'
+    session.flush()
+    assert session.engine.last_params == {
+        'rows': [{'id': 1, 'props': {'name': 'Bubbles II'}}]}
+
+
+def _lookup_session(existing):
+    """A session whose engine finds the nodes with ids among existing"""
+    def handler(statement, params):
+        return [[node_id, {'name': 'm%d' % node_id}]
+                for node_id in params['node_id'] if node_id in existing]
+    return Session(StubEngine(handler))
+
+
+def test_registered_keys_load_in_one_query():
+    session = _lookup_session({1, 2, 3})
+    session.batch_loader(SessionMonkey).add(2, 3, 4)
+
+    monkeys = [session.get(SessionMonkey, key) for key in (1, 2, 3, 4)]
+
+    assert [monkey and monkey.name for monkey in monkeys] == [
+        'm1', 'm2', 'm3', None]
+    assert [params for statement, params in session.engine.executed] == [
+        {'node_id': [2, 3, 4, 1]}]
+    assert session.get(SessionMonkey, 1) is monkeys[0]
+    assert session.get(SessionMonkey, 4) is None
+    assert len(session.engine.executed) == 1
+
+
+def test_missing_keys_are_looked_up_after_flush():
+    existing = {1}
+    session = _lookup_session(existing)
+    assert session.get(SessionMonkey, 2) is None
+
+    existing.add(2)
+    session.flush()
+
+    assert session.get(SessionMonkey, 2).name == 'm2'
+    assert len(session.engine.executed) == 2
+
+
+def test_batch_loader_holds_looked_up_instances_weakly():
+    session = _lookup_session({1, 2})
+    loader = session.batch_loader(SessionMonkey)
+    loader.add(1, 2)
+    session.get(SessionMonkey, 1)
+    gc.collect()
+
+    # Only looked up instances are released
+    assert 1 not in loader
+    assert 2 in loader
+    assert session.get(SessionMonkey, 2).name == 'm2'
+    assert len(session.engine.executed) == 1
+
+
+def test_get_many_keeps_key_order():
+    session = _lookup_session({1, 2, 3})
+    bubbles = session.get(SessionMonkey, 2)
+
+    monkeys = session.get_many(SessionMonkey, [3, 5, 2, 1, 3])
+
+    assert monkeys[2] is bubbles
+    assert [monkey and monkey.name for monkey in monkeys] == [
+        'm3', None, 'm2', 'm1', 'm3']
+    assert session.engine.last_params == {'node_id': [3, 5, 1]}
+
+
+def test_expunged_instance_leaves_batch_loader():
+    session = _lookup_session({1})
+    bubbles = session.get(SessionMonkey, 1)
+    session.expunge(bubbles)
+
+    assert session.get(SessionMonkey, 1) is not bubbles
+    assert len(session.engine.executed) == 2
+
+
+def test_rel_loads_for_whole_session(session):
+    bubbles, coco = session.query(SessionMonkey).all()
+    session.engine.handler = lambda statement, params: [
+        [1, {'name': 'Bubbles'}, [2], [{'name': 'Coco'}]],
+        [2, {'name': 'Coco'}, [], []]]
+
+    assert bubbles.friends == [coco]
+    assert coco.friends == []
+    assert len(session.engine.executed) == 2
+    assert session.engine.last_params == {'node_id': [1, 2]}
+
+
+def _friends_session(count):
+    """A session whose engine has count monkeys, each without friends"""
+    def handler(statement, params):
+        node_ids = params.get('node_id', range(1, count + 1))
+        if 'OPTIONAL MATCH' in statement:
+            return [[node_id, {}, [], []] for node_id in node_ids]
+        return [[node_id, {'name': 'm%d' % node_id}] for node_id in node_ids]
+    return Session(StubEngine(handler))
+
+
+def test_yield_per_loads_rels_per_batch():
+    session = _friends_session(5)
+
+    for monkey in session.query(SessionMonkey).yield_per(2):
+        assert monkey.friends == []
+
+    assert [params for statement, params in session.engine.executed] == [
+        {}, {'node_id': [1, 2]}, {'node_id': [3, 4]}, {'node_id': [5]}]
+
+
+def test_partial_instance_is_completed_by_full_row():
+    def handler(statement, params):
+        if '{name: anon_1.name}' in statement:
+            return [[1, {'name': 'Bubbles'}]]
+        return [[1, {'name': 'Bubbles', 'age': '3'}]]
+    session = Session(StubEngine(handler))
+    partial = session.query(SessionMonkey).load_only(SessionMonkey.name).all()
+    assert partial[0].age is None
+    partial[0].name = 'Bubbles II'
+
+    bubbles = session.query(SessionMonkey).all()[0]
+
+    assert bubbles is partial[0]
+    assert (bubbles.name, bubbles.age) == ('Bubbles II', 3)
+    assert ogm.NA_PARTIAL_INSTANCE_VAR not in bubbles.__dict__
+
+
+def test_rel_read_while_iterating_loads_once_per_batch():
+    session = _friends_session(5)
+
+    for monkey in session.query(SessionMonkey):
+        assert monkey.friends == []
+
+    assert [params for statement, params in session.engine.executed] == [
+        {}, {'node_id': [1, 2, 3, 4, 5]}]
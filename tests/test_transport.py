@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from neoalchemy import ogm
+from neoalchemy.engine import create_engine
+from neoalchemy.types import Float, String
+
+
+class TransportMonkey(ogm.Node):
+    name = ogm.Prop(String)
+    weight = ogm.Prop('weight_kg', Float)
+
+
+def test_node_query_takes_one_round_trip(server):
+    server.handler = lambda statement, params: {
+        'columns': ['id(n)', 'properties(n)'],
+        'rows': [[i, {'name': u'mönkey %d' % i, 'weight_kg': i * 1.5}]
+                 for i in range(20)]}
+    engine = create_engine(server.url)
+
+    monkeys = (TransportMonkey.nodes.filter(TransportMonkey.name != 'x')
+               .with_engine(engine).all())
+
+    assert len(server.requests) == 1
+    path, statement, params = server.requests[0]
+    assert path == '/db/data/transaction/commit'
+    assert 'WHERE' in statement
+    assert len(monkeys) == 20
+    assert ogm._instance_id(monkeys[3]) == 3
+    assert monkeys[3].name == u'mönkey 3'
+    assert monkeys[3].weight == 4.5
+    engine.dispose()
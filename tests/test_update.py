@@ -0,0 +1,97 @@
+import pytest
+
+from neoalchemy import exc, ogm
+from neoalchemy.types import Integer, String
+
+from .stubs import StubResult
+
+
+class UpdateMonkey(ogm.Node):
+    name = ogm.Prop(String)
+    age = ogm.Prop(Integer)
+    values = ogm.Prop(String)
+    friends = ogm.Rel('FRIEND', 'UpdateMonkey')
+
+
+def test_update(engine):
+    engine.handler = lambda statement, params: [[4]]
+    query = UpdateMonkey.nodes.filter(UpdateMonkey.age > 3)
+
+    assert query.update({'name': 'x', UpdateMonkey.age: '5'}) == 4
+    assert engine.last_statement == (
+        'MATCH (anon_1:UpdateMonkey)\n'
+        'WHERE anon_1.age > $age\n'
+        'SET anon_1 += $values\n'
+        'RETURN count(DISTINCT anon_1)')
+    assert engine.last_params == {
+        'age': 3, 'values': {'name': 'x', 'age': 5}}
+
+
+def test_update_values_bind_is_kept_apart_from_filters(engine):
+    engine.handler = lambda statement, params: [[1]]
+
+    UpdateMonkey.nodes.filter(UpdateMonkey.values == 'x').update(
+        {'name': 'y'})
+
+    assert 'WHERE anon_1.values = $values\n' in engine.last_statement
+    assert 'SET anon_1 += $values_1\n' in engine.last_statement
+    assert engine.last_params == {'values': 'x', 'values_1': {'name': 'y'}}
+
+
+def test_batched_update_fetches_ids_once(engine):
+    def handler(statement, params):
+        if 'node_ids' not in params:
+            return [[i] for i in range(5)]
+        return [[len(params['node_ids'])]]
+    engine.handler = handler
+    query = UpdateMonkey.nodes.filter(UpdateMonkey.age > 3)
+
+    assert query.update({'name': 'x'}, batch_size=2) == 5
+    assert engine.statements[0] == (
+        'MATCH (anon_1:UpdateMonkey)\n'
+        'WHERE anon_1.age > $age\n'
+        'WITH DISTINCT anon_1\n'
+        'RETURN id(anon_1)')
+    assert [params.get('node_ids') for statement, params
+            in engine.executed] == [None, [0, 1], [2, 3], [4]]
+    assert engine.last_statement == (
+        'UNWIND $node_ids AS node_id\n'
+        'MATCH (anon_1:UpdateMonkey)\n'
+        'WHERE id(anon_1) = node_id\n'
+        'SET anon_1 += $values\n'
+        'RETURN count(DISTINCT anon_1)')
+
+
+def test_delete_counts_deleted_nodes(engine):
+    engine.handler = lambda statement, params: StubResult(
+        stats={'nodes_deleted': 3})
+    query = UpdateMonkey.nodes.filter(UpdateMonkey.age > 3)
+
+    assert query.delete(detach=False) == 3
+    assert engine.last_statement == (
+        'MATCH (anon_1:UpdateMonkey)\n'
+        'WHERE anon_1.age > $age\n'
+        'DELETE anon_1')
+
+
+def test_batched_delete_of_joined_query(engine):
+    deleted = iter([10, 10, 4])
+    engine.handler = lambda statement, params: StubResult(
+        stats={'nodes_deleted': next(deleted)})
+    query = ogm.Query(UpdateMonkey).join(UpdateMonkey.friends)
+
+    assert query.delete(batch_size=10) == 24
+    assert len(engine.executed) == 3
+    # A node matched on several rows takes a single place in the batch
+    assert engine.last_statement == (
+        'MATCH (anon_1:UpdateMonkey), '
+        '(anon_1)-[:FRIEND]->(friends_1:UpdateMonkey)\n'
+        'WITH DISTINCT anon_1\n'
+        'LIMIT $batch_size\n'
+        'DETACH DELETE anon_1')
+
+
+def test_delete_requires_positive_batch_size(engine):
+    with pytest.raises(exc.ArgumentError):
+        UpdateMonkey.nodes.get_query().delete(batch_size=0)
+    assert engine.executed == []